@@ -0,0 +1,63 @@
+import hashlib
+from functools import wraps
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+
+def make_etag(*values):
+    return hashlib.md5(repr(values).encode()).hexdigest()
+
+
+def latest(*timestamps):
+    timestamps = [timestamp for timestamp in timestamps if timestamp is not None]
+    return max(timestamps) if timestamps else None
+
+
+def collection_validators(queryset, *timestamp_fields):
+    """
+    Returns the validators of a list of objects, computed from the row count and the
+    latest timestamps of the queryset with one aggregate query.
+    """
+    aggregates = queryset.order_by().aggregate(
+        row_count=Count('pk'), **{field: Max(field) for field in timestamp_fields}
+    )
+    timestamps = [aggregates[field] for field in timestamp_fields]
+    return make_etag(aggregates['row_count'], *timestamps), latest(*timestamps)
+
+
+def conditional_get(method):
+    """
+    Decorates the `get` method of an API view to answer conditional requests.
+
+    The view computes the validators of the requested object with
+    `get_validators(request, *args, **kwargs)`, returning an (etag, last_modified) pair,
+    or `None` when the object does not exist. Requests with a matching `If-None-Match` or
+    `If-Modified-Since` header get an empty 304 response, without calling `method`.
+    Validators are checked after authentication and permission checks.
+    """
+    @wraps(method)
+    def get(view, request, *args, **kwargs):
+        validators = view.get_validators(request, *args, **kwargs)
+        if validators is None:
+            return method(view, request, *args, **kwargs)
+
+        etag, last_modified = validators
+        # the browsable API and JSON representations of an object differ
+        etag = quote_etag(make_etag(etag, request.accepted_renderer.format))
+        last_modified = int(last_modified.timestamp()) if last_modified is not None else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = method(view, request, *args, **kwargs)
+        else:
+            # 304 Not Modified, or 412 Precondition Failed, without a body
+            response = Response(status=response.status_code)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            patch_vary_headers(response, ('Accept',))
+        return response
+    return get
@@ -1,6 +1,133 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from collections import OrderedDict
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import OrderingFilter
 from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from django.conf import settings
 
 
 class LimitOffsetPaginationWithUpperBound(LimitOffsetPagination):
     max_limit = settings.MAX_PAGE_SIZE
+
+
+def encode_cursor(position):
+    """
+    Encodes a keyset position, a list of JSON serializable values, into an opaque cursor string.
+    """
+    return urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor created by `encode_cursor` back into a keyset position.
+    """
+    try:
+        position = json.loads(urlsafe_b64decode(cursor.encode()))
+    except (BinasciiError, UnicodeError, ValueError):
+        raise NotFound('Invalid cursor')
+    if not isinstance(position, list):
+        raise NotFound('Invalid cursor')
+    return position
+
+
+class LimitOffsetOrKeysetPagination(LimitOffsetPaginationWithUpperBound):
+    """
+    Limit/offset pagination, unless the request has a `cursor` query parameter.
+
+    Requests opt in to keyset pagination with an empty `cursor` for the first page, and follow
+    the `next` links from there. Pages are ordered by the `ordering` of the request, or the
+    default ordering of the model, with `id` as a tiebreaker, and start right after the
+    position encoded in the cursor. No rows are counted or skipped, so every page costs the
+    same as the first one.
+    """
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.display_page_controls = False
+        self.ordering = self.get_keyset_ordering(queryset, request, view)
+        queryset = queryset.order_by(*(f'-{field.name}' if descending else field.name
+                                       for field, descending in self.ordering))
+
+        cursor = request.query_params[self.cursor_query_param]
+        if cursor:
+            queryset = queryset.filter(self.after_position(self.decode_position(cursor)))
+
+        page = list(queryset[:self.limit + 1])
+        self.next_position = None
+        if len(page) > self.limit:
+            page = page[:self.limit]
+            self.next_position = [field.value_to_string(page[-1]) for field, _ in self.ordering]
+        return page
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data)
+        ]))
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(self.next_position))
+
+    def get_keyset_ordering(self, queryset, request, view):
+        """
+        Returns the ordering of the pages as a list of (field, descending) pairs,
+        ending with the primary key.
+        """
+        ordering = OrderingFilter().get_ordering(request, queryset, view) or queryset.model._meta.ordering
+        opts = queryset.model._meta
+        keyset = []
+        for term in ordering:
+            name = term.lstrip('-')
+            try:
+                field = opts.pk if name == 'pk' else opts.get_field(name)
+            except FieldDoesNotExist:
+                raise ValidationError({'ordering': [f'Cursor pagination does not support ordering by {name}.']})
+            keyset.append((field, term.startswith('-')))
+            if field.primary_key:
+                return keyset
+        # rows with the same values of the ordering fields follow the primary key order
+        keyset.append((opts.pk, keyset[0][1] if keyset else False))
+        return keyset
+
+    def decode_position(self, cursor):
+        position = decode_cursor(cursor)
+        if len(position) != len(self.ordering):
+            raise NotFound('Invalid cursor')
+        try:
+            return [field.to_python(value) for (field, _), value in zip(self.ordering, position)]
+        except DjangoValidationError:
+            raise NotFound('Invalid cursor')
+
+    def after_position(self, position):
+        """
+        Returns the filter of the rows that follow `position` in the keyset ordering.
+        """
+        after = Q()
+        equal = Q()
+        for (field, descending), value in zip(self.ordering, position):
+            lookup = 'lt' if descending else 'gt'
+            after |= equal & Q(**{f'{field.name}__{lookup}': value})
+            equal &= Q(**{field.name: value})
+        # a plain range condition on the first field lets the database seek
+        # to the position in the index, instead of scanning it from the start
+        first_field, descending = self.ordering[0]
+        return Q(**{f'{first_field.name}__{"lte" if descending else "gte"}': position[0]}) & after
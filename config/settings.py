@@ -94,6 +94,31 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# The product catalog cache keeps its version tokens here. The local memory cache is only
+# safe while the API is served by a single process (like the development server): with
+# several worker processes, product changes made by one worker are never seen by the catalog
+# cache of the others. Configure a shared backend (e.g. memcached or redis) before deploying,
+# `manage.py check --deploy` warns about it (products.W001).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+CATALOG_CACHE_SIZE = 10000
+
+# Price histograms are cached for a short time, they may lag behind product changes that long
+PRICE_HISTOGRAM_CACHE_TIMEOUT = 60
+MAX_PRICE_HISTOGRAM_BUCKETS = 100
+
+# Bestseller leaderboards are cached per window, up to MAX_BESTSELLERS products each
+BESTSELLERS_CACHE_TIMEOUT = 60
+MAX_BESTSELLERS = 100
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -148,8 +173,15 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 DEFAULT_PAGE_SIZE = 100
 MAX_PAGE_SIZE = 250
 
+# Bulk Operations
+MAX_BULK_STOCK_CHANGES = 10000
+MAX_BULK_STATUS_CHANGES = 10000
+
+# Daily sales reports
+MAX_SALES_REPORT_DAYS = 366
+
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'config.pagination.LimitOffsetPaginationWithUpperBound',
+    'DEFAULT_PAGINATION_CLASS': 'config.pagination.LimitOffsetOrKeysetPagination',
     'PAGE_SIZE': DEFAULT_PAGE_SIZE,
 
     'DEFAULT_FILTER_BACKENDS': (
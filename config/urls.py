@@ -4,6 +4,7 @@ from django.conf import settings
 from django.urls import path, include
 from django.views.generic import TemplateView
 from rest_framework.permissions import AllowAny
+from orders.views import ProductBestsellersView
 from .views import ApiRootView, OpenApiSchemaView
 
 
@@ -11,6 +12,8 @@ urlpatterns = [
     path('', ApiRootView.as_view(), name=ApiRootView.name),
     path('schema/', OpenApiSchemaView.as_view(), name=OpenApiSchemaView.name),
     path('admin/', admin.site.urls),
+    # served by the orders app, which owns the sales the leaderboards are computed from
+    path('products/bestsellers/', ProductBestsellersView.as_view(), name=ProductBestsellersView.name),
     path('products/', include('products.urls')),
     path('orders/', include('orders.urls')),
     path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
@@ -1,9 +1,31 @@
 import pytest
 from django.contrib.auth.models import User, Group, Permission
 from django.conf import settings
+from django.core.cache import cache
 from products.models import Product, ProductStock
 from orders.models import Order, OrderItem
 from orders.serializers import OrderSerializer
+from products.cache import catalog
+
+
+def pytest_addoption(parser):
+    parser.addoption('--run-slow', action='store_true', default=False, help='run slow tests and benchmarks')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--run-slow'):
+        return
+    skip_slow = pytest.mark.skip(reason='needs the --run-slow option')
+    for item in items:
+        if 'slow' in item.keywords:
+            item.add_marker(skip_slow)
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # test transactions are rolled back without invalidating cached data
+    cache.clear()
+    catalog.clear()
 
 # User Fixtures
 
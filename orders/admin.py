@@ -16,6 +16,7 @@ class OrderStatusInline(admin.TabularInline):
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'first_name', 'last_name', 'email',
                     'city', 'country',
+                    'item_count',
                     'total_cost',
                     'created')
     list_filter = ('created', 'updated',)
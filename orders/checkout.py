@@ -0,0 +1,33 @@
+from django.db import transaction
+from products import stock
+from products.models import Product
+from .models import Order, OrderItem
+
+
+def checkout(customer, lines):
+    """
+    Places an order in one transaction.
+
+    `customer` holds the fields of the order, and every line is a dict with a `product_id` and
+    a `quantity`. The products of all the lines are read with one query, which snapshots their
+    prices, the stock of every product is decreased with one conditional UPDATE, and the order
+    items are inserted in bulk. Raises `Product.DoesNotExist` for unknown products and
+    `InsufficientStock` when a product does not have enough stock, in which case nothing is written.
+    """
+    quantities = {line['product_id']: line['quantity'] for line in lines}
+    with transaction.atomic():
+        products = Product.objects.in_bulk(list(quantities))
+        for product_id in quantities:
+            if product_id not in products:
+                raise Product.DoesNotExist(f"Product {product_id} does not exist.")
+
+        stock.remove_stock_many(quantities)
+        # creates the initial order status as well
+        order = Order.objects.create(**customer)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=products[line['product_id']], quantity=line['quantity'],
+                      price=products[line['product_id']].price)
+            for line in lines
+        ])
+        order.refresh_from_db(fields=Order.TOTALS_UPDATE_FIELDS)
+    return order
@@ -1,5 +1,5 @@
 from django_filters import rest_framework as filters
-from .models import Order
+from .models import Order, OrderStatus
 
 
 class OrderFilter(filters.FilterSet):
@@ -9,6 +9,15 @@ class OrderFilter(filters.FilterSet):
     created_to = filters.DateTimeFilter(
         field_name='created', lookup_expr='lte'
     )
+    min_total = filters.NumberFilter(
+        field_name='total_cost', lookup_expr='gte'
+    )
+    max_total = filters.NumberFilter(
+        field_name='total_cost', lookup_expr='lte'
+    )
+    status = filters.ChoiceFilter(
+        field_name='current_status', choices=OrderStatus.STATUS_CHOICES
+    )
 
     class Meta:
         model = Order
@@ -18,5 +27,8 @@ class OrderFilter(filters.FilterSet):
             'country',
             'created',
             'created_from',
-            'created_to'
+            'created_to',
+            'min_total',
+            'max_total',
+            'status'
         )
@@ -0,0 +1,38 @@
+import datetime
+import heapq
+from django.db.models import Sum
+from django.utils import timezone
+from .models import DailyProductSales
+
+
+# sliding windows of whole days, today included
+BESTSELLER_WINDOWS = {'1d': 1, '7d': 7, '30d': 30}
+
+RANKINGS = {
+    'by_units': lambda row: (row['quantity'], row['revenue'], -row['product_id']),
+    'by_revenue': lambda row: (row['revenue'], row['quantity'], -row['product_id']),
+}
+
+
+def bestsellers(window, n, today=None):
+    """
+    Returns the `n` products with the most units sold (`by_units`) and the most revenue
+    (`by_revenue`) in the last days of `window`, from the daily product sales rollup.
+
+    The rollup rows of the window are summed per product by the database, the top products
+    of both rankings are then picked with a bounded heap, without sorting all the products.
+    Ties are ranked by the other figure, then by product id.
+    """
+    until = today or timezone.localdate()
+    since = until - datetime.timedelta(days=BESTSELLER_WINDOWS[window] - 1)
+    rows = list(DailyProductSales.objects
+                .filter(day__gte=since, day__lte=until)
+                .values('product_id')
+                .annotate(quantity=Sum('quantity'), revenue=Sum('revenue'), order_count=Sum('order_count'))
+                .order_by())
+    return {
+        'window': window,
+        'since': since,
+        'until': until,
+        **{ranking: heapq.nlargest(n, rows, key=key) for ranking, key in RANKINGS.items()},
+    }
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the item count and total cost columns of orders from their order items.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of orders updated per transaction.')
+        parser.add_argument('--check', action='store_true',
+                            help='Only report orders whose totals differ from their order items.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        order_ids = Order.objects.order_by('pk').values_list('pk', flat=True)
+        last_id = 0
+        updated = 0
+        while True:
+            batch = list(order_ids.filter(pk__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            if options['check']:
+                updated += self.report_stale_orders(batch)
+            else:
+                with transaction.atomic():
+                    updated += Order.objects.filter(pk__in=batch).update_totals()
+            last_id = batch[-1]
+
+        if options['check']:
+            self.stdout.write(self.style.SUCCESS(f'{updated} order(s) with stale totals.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Totals rebuilt for {updated} order(s).'))
+
+    def report_stale_orders(self, order_ids):
+        stale_orders = (Order.objects
+                        .filter(pk__in=order_ids)
+                        .with_item_totals()
+                        .filter(~Q(item_count=F('items_count')) | ~Q(total_cost=F('items_total')))
+                        .values_list('pk', 'item_count', 'total_cost', 'items_count', 'items_total'))
+        count = 0
+        for order_id, item_count, total_cost, items_count, items_total in stale_orders:
+            self.stdout.write(f'Order {order_id}: {item_count} item(s) for {total_cost}, '
+                              f'order items {items_count} item(s) for {items_total}.')
+            count += 1
+        return count
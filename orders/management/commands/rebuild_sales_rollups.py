@@ -0,0 +1,64 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from config.exports import IN_CLAUSE_CHUNK_SIZE
+from orders.models import Order, SALES_ROLLUPS
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the daily product and country sales rollups from the orders, a few days at a time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-days', type=int, default=30,
+                            help='Number of days rebuilt per transaction.')
+        parser.add_argument('--since', type=datetime.date.fromisoformat,
+                            help='Only rebuild the days from this date (YYYY-MM-DD) on.')
+
+    def handle(self, *args, **options):
+        batch_days = options['batch_days']
+        if batch_days < 1:
+            raise CommandError('--batch-days has to be at least 1.')
+
+        orders = Order.objects.order_by('created').values_list('created', flat=True)
+        first_created = orders.first()
+        if first_created is None:
+            for rollup in SALES_ROLLUPS:
+                rollup.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS('No orders, sales rollups cleared.'))
+            return
+        first_day = timezone.localdate(first_created)
+        if options['since'] is not None:
+            first_day = options['since']
+        else:
+            # rows of days before the first order are stale
+            for rollup in SALES_ROLLUPS:
+                rollup.objects.filter(day__lt=first_day).delete()
+        last_day = max(timezone.localdate(orders.last()), timezone.localdate())
+
+        day = first_day
+        rows = 0
+        while day <= last_day:
+            until = min(day + datetime.timedelta(days=batch_days - 1), last_day)
+            with transaction.atomic():
+                rows += self.rebuild_days(day, until)
+            self.stdout.write(f'{day} to {until}: rebuilt.')
+            day = until + datetime.timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f'Sales rollups rebuilt with {rows} row(s).'))
+
+    def rebuild_days(self, since, until):
+        start = timezone.make_aware(datetime.datetime.combine(since, datetime.time.min))
+        end = timezone.make_aware(datetime.datetime.combine(until + datetime.timedelta(days=1), datetime.time.min))
+        order_ids = list(Order.objects.filter(created__gte=start, created__lt=end).values_list('pk', flat=True))
+        rows = 0
+        for rollup in SALES_ROLLUPS:
+            rollup.objects.filter(day__gte=since, day__lte=until).delete()
+            contributions = rollup.objects.contributions(order_ids)
+            rollup.objects.bulk_create(
+                [rollup(**dict(zip(rollup.key_fields + rollup.value_fields, (*key, *values))))
+                 for key, values in contributions.items()],
+                batch_size=IN_CLAUSE_CHUNK_SIZE
+            )
+            rows += len(contributions)
+        return rows
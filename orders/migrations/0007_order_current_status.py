@@ -0,0 +1,39 @@
+# Generated by Django 3.2.4 on 2026-10-18 10:42
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_current_status(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    OrderStatus = apps.get_model('orders', 'OrderStatus')
+    latest_status = OrderStatus.objects.filter(order=OuterRef('pk')).order_by('-create_timestamp', '-pk')
+    Order.objects.update(
+        current_status=Subquery(latest_status.values('status')[:1]),
+        current_status_timestamp=Subquery(latest_status.values('create_timestamp')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_order_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='current_status',
+            field=models.CharField(blank=True, editable=False, max_length=1, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='current_status_timestamp',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['current_status', 'id'], name='orders_current_status_id_idx'),
+        ),
+        migrations.RunPython(copy_current_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 3.2.4 on 2026-10-18 10:53
+
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def fill_sales_rollups(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    DailyProductSales = apps.get_model('orders', 'DailyProductSales')
+    DailyCountrySales = apps.get_model('orders', 'DailyCountrySales')
+    items = (OrderItem.objects
+             .exclude(order__current_status='X')
+             .annotate(day=TruncDate('order__created'))
+             .values('day', 'product_id')
+             .annotate(sold=Sum('quantity'),
+                       sales=Sum(F('price') * F('quantity'),
+                                 output_field=models.DecimalField(max_digits=14, decimal_places=2)),
+                       orders=Count('order_id', distinct=True))
+             .order_by())
+    DailyProductSales.objects.bulk_create(
+        [DailyProductSales(day=row['day'], product_id=row['product_id'], quantity=row['sold'],
+                           revenue=row['sales'], order_count=row['orders']) for row in items],
+        batch_size=500
+    )
+    orders = (Order.objects
+              .exclude(current_status='X')
+              .annotate(day=TruncDate('created'))
+              .values('day', 'country')
+              .annotate(orders=Count('pk'), items=Sum('item_count'), sales=Sum('total_cost'))
+              .order_by())
+    DailyCountrySales.objects.bulk_create(
+        [DailyCountrySales(day=row['day'], country=row['country'], order_count=row['orders'],
+                           item_count=row['items'], revenue=row['sales']) for row in orders],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_low_stock_watchlist'),
+        ('orders', '0007_order_current_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCountrySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('country', models.CharField(max_length=64)),
+                ('order_count', models.IntegerField(default=0)),
+                ('item_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily Country Sales',
+                'ordering': ('day', 'country'),
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('order_count', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='products.product')),
+            ],
+            options={
+                'verbose_name_plural': 'Daily Product Sales',
+                'ordering': ('day', 'product'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='dailycountrysales',
+            index=models.Index(fields=['country', 'day'], name='orders_country_sales_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailycountrysales',
+            unique_together={('day', 'country')},
+        ),
+        migrations.AddIndex(
+            model_name='dailyproductsales',
+            index=models.Index(fields=['product', 'day'], name='orders_product_sales_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailyproductsales',
+            unique_together={('day', 'product')},
+        ),
+        migrations.RunPython(fill_sales_rollups, migrations.RunPython.noop),
+    ]
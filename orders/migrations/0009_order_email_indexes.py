@@ -0,0 +1,23 @@
+# Generated by Django 3.2.4 on 2026-10-18 10:58
+
+from django.db import migrations, models
+import django.db.models.expressions
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_daily_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['email', 'id'], name='orders_email_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(django.db.models.functions.text.Lower('email'), django.db.models.expressions.F('id'), name='orders_email_lower_id_idx'),
+        ),
+    ]
@@ -1,8 +1,186 @@
-from django.db import models
+from functools import reduce
+from operator import or_
+from django.db import connections, models, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Lower, TruncDate
 from django.utils import timezone
+from config.exports import IN_CLAUSE_CHUNK_SIZE, chunked
 from products.models import Product
 
 
+class OrderQuerySet(models.QuerySet):
+    def with_item_totals(self):
+        """
+        Annotates every order with the number (`items_count`) and the total cost (`items_total`)
+        of its items, computed by the database from the order items, so the totals of a whole
+        batch of orders are read in a single query. The `item_count` and `total_cost` columns
+        hold the same values, as long as they are up to date.
+        """
+        return self.annotate(
+            items_count=Count('items'),
+            items_total=Coalesce(Sum(F('items__price') * F('items__quantity')), Value(0),
+                                 output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+        )
+
+    def update_totals(self):
+        """
+        Recomputes the `item_count` and `total_cost` columns of the orders from their items,
+        with a single UPDATE statement. The orders are marked as updated, as their items changed.
+        """
+        items = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+        return self.update(
+            updated=timezone.now(),
+            item_count=Coalesce(Subquery(items.annotate(count=Count('pk')).values('count')), Value(0)),
+            total_cost=Coalesce(Subquery(items.annotate(total=Sum(F('price') * F('quantity'))).values('total')),
+                                Value(0), output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+        )
+
+    def update_current_status(self):
+        """
+        Copies the latest status of the orders to their `current_status` and
+        `current_status_timestamp` columns, with a single UPDATE statement. The orders are
+        marked as updated, since the status filter of the order list reads those columns.
+        """
+        latest_status = (OrderStatus.objects
+                         .filter(order=OuterRef('pk'))
+                         .order_by('-create_timestamp', '-pk'))
+        with transaction.atomic(using=self.db):
+            cancelled_before = self.cancelled_ids()
+            updated = self.update(
+                current_status=Subquery(latest_status.values('status')[:1]),
+                current_status_timestamp=Subquery(latest_status.values('create_timestamp')[:1]),
+                updated=timezone.now(),
+            )
+            update_cancelled_sales(cancelled_before, self.cancelled_ids())
+        return updated
+
+    def by_email(self, email):
+        """
+        Returns the orders of a customer, with a case-insensitive match of the email
+        which is read from the LOWER(email) index. Both sides are lowered by the database,
+        so that they agree where its LOWER() differs from Python's (e.g. non-ASCII letters
+        on SQLite).
+        """
+        return self.annotate(email_lower=Lower('email')).filter(email_lower=Lower(Value(email)))
+
+    def update(self, **kwargs):
+        if not Order.SALES_FIELDS.intersection(kwargs):
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            # the orders move to other rows of the sales rollups
+            order_ids = list(self.values_list('pk', flat=True))
+            sales = sales_contributions(order_ids)
+            updated = super().update(**kwargs)
+            update_sales_rollups(sales, order_ids)
+        return updated
+
+    def cancelled_ids(self):
+        return set(self.filter(current_status=OrderStatus.CANCELLED).values_list('pk', flat=True))
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            order_ids = list(self.values_list('pk', flat=True))
+            sales = sales_contributions(order_ids)
+            deleted = super().delete()
+            update_sales_rollups(sales, order_ids)
+        return deleted
+
+
+class OrderItemQuerySet(models.QuerySet):
+    """
+    Keeps the totals of the orders and the daily sales rollups up to date on bulk writes
+    of order items.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        order_ids = {obj.order_id for obj in objs}
+        with transaction.atomic(using=self.db):
+            sales = sales_contributions(order_ids)
+            objs = super().bulk_create(objs, *args, **kwargs)
+            Order.objects.filter(pk__in=order_ids).update_totals()
+            update_sales_rollups(sales, order_ids)
+        return objs
+
+    def update(self, **kwargs):
+        with transaction.atomic(using=self.db):
+            order_ids = set(self.values_list('order_id', flat=True))
+            if 'order' in kwargs or 'order_id' in kwargs:
+                # items moved to another order
+                new_order = kwargs.get('order', kwargs.get('order_id'))
+                order_ids.add(getattr(new_order, 'pk', new_order))
+            sales = sales_contributions(order_ids)
+            updated = super().update(**kwargs)
+            Order.objects.filter(pk__in=order_ids).update_totals()
+            update_sales_rollups(sales, order_ids)
+        return updated
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            order_ids = set(self.values_list('order_id', flat=True))
+            sales = sales_contributions(order_ids)
+            deleted = super().delete()
+            Order.objects.filter(pk__in=order_ids).update_totals()
+            update_sales_rollups(sales, order_ids)
+        return deleted
+
+
+class OrderStatusQuerySet(models.QuerySet):
+    """
+    Keeps the current status of the orders up to date on bulk writes of order statuses.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            Order.objects.filter(pk__in={obj.order_id for obj in objs}).update_current_status()
+        return objs
+
+    def update(self, **kwargs):
+        with transaction.atomic(using=self.db):
+            order_ids = set(self.values_list('order_id', flat=True))
+            updated = super().update(**kwargs)
+            if 'order' in kwargs or 'order_id' in kwargs:
+                # statuses moved to another order
+                new_order = kwargs.get('order', kwargs.get('order_id'))
+                order_ids.add(getattr(new_order, 'pk', new_order))
+            Order.objects.filter(pk__in=order_ids).update_current_status()
+        return updated
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            order_ids = set(self.values_list('order_id', flat=True))
+            deleted = super().delete()
+            Order.objects.filter(pk__in=order_ids).update_current_status()
+        return deleted
+
+    def create_transition(self, order_id, current_status, current_status_timestamp, **fields):
+        """
+        Adds a new status to an order, as long as the current status of the order is still
+        `current_status` (at `current_status_timestamp`). The current status columns are
+        swapped with a conditional UPDATE, and the new status is inserted in the same transaction.
+        Returns the new status, or `None` when the current status of the order has changed.
+        The new status has to be the latest status of the order.
+        """
+        order_status = self.model(order_id=order_id, **fields)
+        with transaction.atomic(using=self.db):
+            swapped = Order.objects.filter(
+                pk=order_id,
+                current_status=current_status,
+                current_status_timestamp=current_status_timestamp,
+            ).update(current_status=order_status.status,
+                     current_status_timestamp=order_status.create_timestamp,
+                     updated=timezone.now())
+            if not swapped:
+                return None
+            # the current status is already up to date, so the row is inserted without
+            # OrderStatus.save(); unlike bulk_create(), Model.save() sets the pk on SQLite
+            models.Model.save(order_status, force_insert=True, using=self.db)
+            update_cancelled_sales({order_id} if current_status == OrderStatus.CANCELLED else set(),
+                                   {order_id} if order_status.status == OrderStatus.CANCELLED else set())
+        return order_status
+
+
 class Order(models.Model):
     first_name = models.CharField(max_length=64)
     last_name = models.CharField(max_length=64)
@@ -13,36 +191,82 @@ class Order(models.Model):
     country = models.CharField(max_length=64)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
+    # Totals of the order items, maintained by OrderItem writes
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+    total_cost = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    # Latest order status, maintained by OrderStatus writes
+    current_status = models.CharField(max_length=1, null=True, blank=True, editable=False)
+    current_status_timestamp = models.DateTimeField(null=True, blank=True, editable=False)
+
+    TOTAL_FIELDS = ('item_count', 'total_cost')
+    # columns written by OrderQuerySet.update_totals
+    TOTALS_UPDATE_FIELDS = TOTAL_FIELDS + ('updated',)
+    # columns the keys of the sales rollup rows of an order are read from
+    SALES_FIELDS = {'created', 'country'}
+    STATUS_FIELDS = ('current_status', 'current_status_timestamp')
+
+    objects = OrderQuerySet.as_manager()
 
     class Meta:
         ordering = ('id',)
+        indexes = [
+            # keyset pages of the order list are ordered by one of these fields and the id
+            models.Index(fields=['last_name', 'id'], name='orders_last_name_id_idx'),
+            models.Index(fields=['country', 'id'], name='orders_country_id_idx'),
+            models.Index(fields=['created', 'id'], name='orders_created_id_idx'),
+            models.Index(fields=['total_cost', 'id'], name='orders_total_cost_id_idx'),
+            models.Index(fields=['current_status', 'id'], name='orders_current_status_id_idx'),
+            models.Index(fields=['email', 'id'], name='orders_email_id_idx'),
+            # customer lookups match the email whatever its case, see Order.objects.by_email
+            models.Index(Lower('email'), 'id', name='orders_email_lower_id_idx'),
+        ]
 
     def __str__(self):
         return f'Order {self.id}'
 
     @property
     def number_of_items(self):
-        return self.items.count()
+        return self.item_count
 
     @property
-    def total_cost(self):
-        if self.items.count() > 0:
-            return sum(item.cost for item in self.items.all())
+    def current_status_name(self):
+        return dict(OrderStatus.STATUS_CHOICES).get(self.current_status)
 
     def get_recent_status(self):
-        if OrderStatus.objects.filter(order_id=self.pk):
-            recent_status = self.statuses.latest('create_timestamp')
-            return recent_status
+        statuses = self.get_status_updates()
+        if statuses:
+            return max(statuses, key=lambda order_status: order_status.create_timestamp)
 
     def get_status_updates(self):
-        if OrderStatus.objects.filter(order_id=self.pk):
-            return self.statuses
+        # a single query, or none when the statuses are prefetched
+        statuses = self.statuses.all()
+        if statuses:
+            return statuses
 
     def save(self, *args, **kwargs):
         isNewInstance = self.pk is None
-        super().save(*args, **kwargs)
+        if not isNewInstance and kwargs.get('update_fields') is None:
+            # total and status columns are owned by the order items and statuses,
+            # never overwrite them with stale values
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key
+                                       and field.name not in self.TOTAL_FIELDS + self.STATUS_FIELDS]
+        with transaction.atomic():
+            sales = sales_contributions([] if isNewInstance else [self.pk])
+            super().save(*args, **kwargs)
+            if isNewInstance:
+                created_status = OrderStatus.objects.create(order=self, status=OrderStatus.CREATED)
+            update_sales_rollups(sales, [self.pk])
         if isNewInstance:
-            OrderStatus.objects.create(order=self, status=OrderStatus.CREATED)
+            self.current_status = created_status.status
+            self.current_status_timestamp = created_status.create_timestamp
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            sales = sales_contributions([self.pk])
+            deleted = super().delete(*args, **kwargs)
+            update_sales_rollups(sales, [self.pk])
+        return deleted
 
 
 class OrderItem(models.Model):
@@ -51,6 +275,8 @@ class OrderItem(models.Model):
     quantity = models.PositiveIntegerField(default=1)
     price = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
 
+    objects = OrderItemQuerySet.as_manager()
+
     def __str__(self):
         return str(self.id)
 
@@ -58,7 +284,30 @@ class OrderItem(models.Model):
         isNewInstance = self.pk is None
         if isNewInstance:
             self.price = self.product.price
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            order_ids = {self.order_id}
+            if not isNewInstance:
+                # the item may have been moved from another order
+                order_ids.update(OrderItem.objects.filter(pk=self.pk).values_list('order_id', flat=True))
+            sales = sales_contributions(order_ids)
+            super().save(*args, **kwargs)
+            Order.objects.filter(pk__in=order_ids).update_totals()
+            update_sales_rollups(sales, order_ids)
+        self.refresh_order_totals()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            sales = sales_contributions([self.order_id])
+            deleted = super().delete(*args, **kwargs)
+            Order.objects.filter(pk=self.order_id).update_totals()
+            update_sales_rollups(sales, [self.order_id])
+        self.refresh_order_totals()
+        return deleted
+
+    def refresh_order_totals(self):
+        # keep the in-memory order in sync as well
+        if OrderItem.order.is_cached(self):
+            self.order.refresh_from_db(fields=Order.TOTALS_UPDATE_FIELDS)
 
     @property
     def cost(self):
@@ -82,11 +331,25 @@ class OrderStatus(models.Model):
         (CANCELLED, 'Cancelled'),
     )
 
+    # statuses an order can move to from its current status, with `None` for an order without
+    # any status. Closed and cancelled orders can not obtain a new status.
+    TRANSITIONS = {
+        None: (CREATED,),
+        CREATED: (ACCEPTED, CANCELLED),
+        ACCEPTED: (SENT, CANCELLED),
+        SENT: (DELIVERED, CANCELLED),
+        DELIVERED: (CLOSED,),
+        CLOSED: (),
+        CANCELLED: (),
+    }
+
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='statuses')
     status = models.CharField(max_length=1, choices=STATUS_CHOICES)
     create_timestamp = models.DateTimeField(default=timezone.now)
     comment = models.CharField(max_length=255, blank=True, null=True)
 
+    objects = OrderStatusQuerySet.as_manager()
+
     class Meta:
         ordering = ('-order_id', '-create_timestamp',)
         verbose_name_plural = 'Order Statuses'
@@ -99,3 +362,221 @@ class OrderStatus(models.Model):
     def status_name(self):
         return self.get_status_display()
 
+    @classmethod
+    def can_transition(cls, current_status, new_status):
+        return new_status in cls.TRANSITIONS.get(current_status, ())
+
+    def save(self, *args, **kwargs):
+        isNewInstance = self._state.adding
+        with transaction.atomic():
+            order_ids = {self.order_id}
+            if not isNewInstance:
+                # the status may have been moved from another order
+                order_ids.update(OrderStatus.objects.filter(pk=self.pk).values_list('order_id', flat=True))
+            super().save(*args, **kwargs)
+            if not isNewInstance:
+                # edits of an existing status do not show up in the status count or timestamps,
+                # so they mark the order as updated
+                Order.objects.filter(pk=self.order_id).update(updated=timezone.now())
+            Order.objects.filter(pk__in=order_ids).update_current_status()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            deleted = super().delete(*args, **kwargs)
+            Order.objects.filter(pk=self.order_id).update_current_status()
+        return deleted
+
+
+
+class SalesRollupManager(models.Manager):
+    """
+    Maintains a daily sales rollup table from the contributions of orders, each contribution
+    being the values an order adds to the rollup rows it is counted in. Rollups define the
+    `key_fields` and `value_fields` of their rows, and `contributions_query`, returning the
+    keys and values of the rows the given orders contribute to, in that order.
+    """
+
+    def contributions(self, order_ids, include_cancelled=False):
+        """
+        Returns the sum of the contributions of the given orders, by rollup row key.
+        Cancelled orders do not contribute to the rollups, unless `include_cancelled` is set.
+        """
+        contributions = {}
+        for chunk in chunked(order_ids, IN_CLAUSE_CHUNK_SIZE):
+            rows = self.contributions_query(chunk, include_cancelled)
+            key_length = len(self.model.key_fields)
+            for row in rows:
+                key, values = row[:key_length], [value or 0 for value in row[key_length:]]
+                previous = contributions.get(key)
+                contributions[key] = values if previous is None else [a + b for a, b in zip(previous, values)]
+        return contributions
+
+    def apply(self, before, after):
+        """
+        Applies the difference of two sets of contributions to the rollup rows,
+        with one upsert statement per chunk of rows.
+        """
+        deltas = []
+        emptied_keys = []
+        for key in before.keys() | after.keys():
+            old_values = before.get(key, [0] * len(self.model.value_fields))
+            new_values = after.get(key, [0] * len(self.model.value_fields))
+            delta = [new - old for new, old in zip(new_values, old_values)]
+            if any(delta):
+                deltas.append((key, delta))
+                if not any(new_values):
+                    emptied_keys.append(key)
+
+        for chunk in chunked(deltas, IN_CLAUSE_CHUNK_SIZE // 4):
+            self._upsert(chunk)
+        for chunk in chunked(emptied_keys, IN_CLAUSE_CHUNK_SIZE // 4):
+            # rows no orders contribute to anymore
+            self.filter(reduce(or_, [Q(**dict(zip(self.model.key_fields, key))) for key in chunk]),
+                        order_count__lte=0).delete()
+
+    def _upsert(self, deltas):
+        # INSERT ... ON CONFLICT DO UPDATE, the same on SQLite and PostgreSQL
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        table = quote(self.model._meta.db_table)
+        fields = [self.model._meta.get_field(name) for name in self.model.key_fields + self.model.value_fields]
+        columns = ', '.join(quote(field.column) for field in fields)
+        row = '(' + ', '.join(['%s'] * len(fields)) + ')'
+        updates = ', '.join(
+            f'{quote(field.column)} = {table}.{quote(field.column)} + excluded.{quote(field.column)}'
+            for field in fields[len(self.model.key_fields):]
+        )
+        keys = ', '.join(quote(field.column) for field in fields[:len(self.model.key_fields)])
+        params = [
+            field.get_db_prep_save(value, connection)
+            for key, delta in deltas
+            for field, value in zip(fields, (*key, *delta))
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) VALUES {", ".join([row] * len(deltas))} '
+                f'ON CONFLICT ({keys}) DO UPDATE SET {updates}',
+                params
+            )
+
+
+class DailyProductSalesManager(SalesRollupManager):
+    def contributions_query(self, order_ids, include_cancelled=False):
+        items = OrderItem.objects.filter(order_id__in=order_ids)
+        if not include_cancelled:
+            items = items.exclude(order__current_status=OrderStatus.CANCELLED)
+        return (items
+                .annotate(day=TruncDate('order__created'))
+                .values('day', 'product_id')
+                .annotate(sold=Sum('quantity'),
+                          sales=Sum(F('price') * F('quantity'),
+                                    output_field=models.DecimalField(max_digits=14, decimal_places=2)),
+                          orders=Count('order_id', distinct=True))
+                .values_list('day', 'product_id', 'sold', 'sales', 'orders')
+                .order_by())
+
+
+class DailyCountrySalesManager(SalesRollupManager):
+    def contributions_query(self, order_ids, include_cancelled=False):
+        orders = Order.objects.filter(pk__in=order_ids)
+        if not include_cancelled:
+            orders = orders.exclude(current_status=OrderStatus.CANCELLED)
+        return (orders
+                .annotate(day=TruncDate('created'))
+                .values('day', 'country')
+                .annotate(orders=Count('pk'), items=Sum('item_count'), sales=Sum('total_cost'))
+                .values_list('day', 'country', 'orders', 'items', 'sales')
+                .order_by())
+
+
+class DailyProductSales(models.Model):
+    """
+    Units sold, revenue and number of orders of a product per day, of all orders
+    which are not cancelled. The day is the day the order was created.
+    """
+    day = models.DateField()
+    product = models.ForeignKey(Product, related_name='daily_sales', on_delete=models.CASCADE)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    order_count = models.IntegerField(default=0)
+
+    key_fields = ('day', 'product_id')
+    value_fields = ('quantity', 'revenue', 'order_count')
+
+    objects = DailyProductSalesManager()
+
+    class Meta:
+        ordering = ('day', 'product')
+        verbose_name_plural = 'Daily Product Sales'
+        unique_together = ['day', 'product']
+        indexes = [
+            models.Index(fields=['product', 'day'], name='orders_product_sales_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.day}: {self.product_id}'
+
+
+class DailyCountrySales(models.Model):
+    """
+    Number of orders, order items and revenue per country and day, of all orders
+    which are not cancelled. The day is the day the order was created.
+    """
+    day = models.DateField()
+    country = models.CharField(max_length=64)
+    order_count = models.IntegerField(default=0)
+    item_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    key_fields = ('day', 'country')
+    value_fields = ('order_count', 'item_count', 'revenue')
+
+    objects = DailyCountrySalesManager()
+
+    class Meta:
+        ordering = ('day', 'country')
+        verbose_name_plural = 'Daily Country Sales'
+        unique_together = ['day', 'country']
+        indexes = [
+            models.Index(fields=['country', 'day'], name='orders_country_sales_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.day}: {self.country}'
+
+
+SALES_ROLLUPS = (DailyProductSales, DailyCountrySales)
+
+
+def sales_contributions(order_ids, rollups=SALES_ROLLUPS):
+    """
+    Returns the contributions of the given orders to every sales rollup (or to the given
+    `rollups`), to be passed to `update_sales_rollups` once the orders have been written.
+    """
+    order_ids = list(order_ids)
+    return [rollup.objects.contributions(order_ids) for rollup in rollups]
+
+
+def update_sales_rollups(contributions, order_ids, rollups=SALES_ROLLUPS):
+    """
+    Updates the sales rollups after a write to the given orders, from their contributions
+    before the write, as returned by `sales_contributions` for the same `rollups`.
+    """
+    order_ids = list(order_ids)
+    for rollup, before in zip(rollups, contributions):
+        rollup.objects.apply(before, rollup.objects.contributions(order_ids))
+
+
+def update_cancelled_sales(cancelled_before, cancelled_after):
+    """
+    Removes the orders which have been cancelled from the sales rollups, and adds back
+    the orders which are not cancelled anymore, given the ids of the cancelled orders
+    before and after a change of their status.
+    """
+    newly_cancelled = cancelled_after - cancelled_before
+    restored = cancelled_before - cancelled_after
+    if not newly_cancelled and not restored:
+        return
+    for rollup in SALES_ROLLUPS:
+        rollup.objects.apply(rollup.objects.contributions(newly_cancelled, include_cancelled=True),
+                             rollup.objects.contributions(restored, include_cancelled=True))
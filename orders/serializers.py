@@ -1,11 +1,28 @@
+import datetime
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
 from rest_framework import serializers
+from .checkout import checkout
+from .leaderboard import BESTSELLER_WINDOWS
 from .models import Order, OrderItem, OrderStatus
+from products import stock
+from products.cache import catalog
+from products.models import Product
 from products.serializers import ProductDataSerializer
 
 
-class OrderStatusField(serializers.CharField):
-    def to_representation(self, value):
-        return value.get_status_display()
+class OrderItemListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # read the products of all the items, unless already loaded with the items,
+        # from the catalog cache at once
+        items = list(data.all() if isinstance(data, models.Manager) else data)
+        missing_items = [item for item in items if not OrderItem.product.is_cached(item)]
+        if missing_items:
+            products = catalog.get_many(item.product_id for item in missing_items)
+            for item in missing_items:
+                item.product = products[item.product_id]
+        return super().to_representation(items)
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -13,6 +30,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = OrderItem
+        list_serializer_class = OrderItemListSerializer
         fields = (
             'product',
             'quantity',
@@ -55,6 +73,13 @@ class OrderStatusSerializer(serializers.Serializer):
         return instance
 
 
+class OrderStatusChangeSerializer(serializers.Serializer):
+    order_id = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=OrderStatus.STATUS_CHOICES)
+    create_timestamp = serializers.DateTimeField(required=False)
+    comment = serializers.CharField(max_length=255, allow_blank=True, default='')
+
+
 class OrderStatusDisplaySerializer(serializers.Serializer):
     status_name = serializers.CharField()
     create_timestamp = serializers.DateTimeField(read_only=True)
@@ -62,7 +87,7 @@ class OrderStatusDisplaySerializer(serializers.Serializer):
 
 class OrderDetailSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
-    recent_status = OrderStatusField(source='get_recent_status', read_only=True)
+    recent_status = serializers.CharField(source='current_status_name', read_only=True)
     status_updates = OrderStatusDisplaySerializer(source='get_status_updates', many=True)
 
     class Meta:
@@ -81,3 +106,94 @@ class OrderDetailSerializer(serializers.ModelSerializer):
 
 
 
+
+
+class OrderLineSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class OrderCheckoutSerializer(serializers.ModelSerializer):
+    items = OrderLineSerializer(many=True, allow_empty=False)
+
+    class Meta:
+        model = Order
+        fields = ('first_name', 'last_name',
+                  'email',
+                  'address', 'postal_code', 'city', 'country',
+                  'items')
+
+    def validate_items(self, items):
+        product_ids = [item['product_id'] for item in items]
+        if len(set(product_ids)) != len(product_ids):
+            raise serializers.ValidationError('Every product can be ordered only once.')
+        return items
+
+    def create(self, validated_data):
+        lines = validated_data.pop('items')
+        try:
+            return checkout(validated_data, lines)
+        except Product.DoesNotExist as e:
+            raise serializers.ValidationError({'items': [str(e)]})
+        except stock.InsufficientStock as e:
+            raise serializers.ValidationError({'items': [f'Product {e.product_id}: {e}']})
+
+    def to_representation(self, instance):
+        # the order as listed, without reading its items and statuses back
+        return OrderSerializer(instance, context=self.context).data
+
+
+class SalesReportOptionsSerializer(serializers.Serializer):
+    """
+    Validates the day range of a daily sales report, the last year up to today by default.
+    """
+    since = serializers.DateField(required=False)
+    until = serializers.DateField(required=False)
+    country = serializers.CharField(max_length=64, required=False)
+
+    def validate(self, data):
+        until = data.setdefault('until', timezone.localdate())
+        since = data.setdefault('since', until - datetime.timedelta(days=364))
+        if since > until:
+            raise serializers.ValidationError({'since': 'since can not be after until.'})
+        if (until - since).days >= settings.MAX_SALES_REPORT_DAYS:
+            raise serializers.ValidationError(
+                {'since': f'A report can cover at most {settings.MAX_SALES_REPORT_DAYS} days.'}
+            )
+        return data
+
+
+class DailySalesSerializer(serializers.Serializer):
+    day = serializers.DateField()
+    order_count = serializers.IntegerField()
+    item_count = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class DailyProductSalesSerializer(serializers.Serializer):
+    day = serializers.DateField()
+    quantity = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    order_count = serializers.IntegerField()
+
+
+class BestsellersOptionsSerializer(serializers.Serializer):
+    window = serializers.ChoiceField(choices=tuple(BESTSELLER_WINDOWS), default='7d')
+    n = serializers.IntegerField(min_value=1, max_value=settings.MAX_BESTSELLERS, default=10)
+
+
+class BestsellerSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    code = serializers.CharField()
+    name = serializers.CharField()
+    quantity = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    order_count = serializers.IntegerField()
+
+
+class BestsellersSerializer(serializers.Serializer):
+    window = serializers.CharField()
+    since = serializers.DateField()
+    until = serializers.DateField()
+    by_units = BestsellerSerializer(many=True)
+    by_revenue = BestsellerSerializer(many=True)
@@ -0,0 +1,23 @@
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
+from products.models import Product
+from .models import DailyCountrySales, Order, OrderItem, sales_contributions, update_sales_rollups
+
+
+# the daily sales rows of a deleted product are deleted with it
+PRODUCT_DELETE_ROLLUPS = (DailyCountrySales,)
+
+
+@receiver(pre_delete, sender=Product)
+def collect_product_orders(sender, instance, **kwargs):
+    # the items of a deleted product are deleted by the collector, without OrderItem.delete
+    instance._ordered_in = set(OrderItem.objects.filter(product=instance).values_list('order_id', flat=True))
+    instance._ordered_sales = sales_contributions(instance._ordered_in, rollups=PRODUCT_DELETE_ROLLUPS)
+
+
+@receiver(post_delete, sender=Product)
+def update_product_orders(sender, instance, **kwargs):
+    order_ids = getattr(instance, '_ordered_in', None)
+    if order_ids:
+        Order.objects.filter(pk__in=order_ids).update_totals()
+        update_sales_rollups(instance._ordered_sales, order_ids, rollups=PRODUCT_DELETE_ROLLUPS)
@@ -0,0 +1,112 @@
+import pytest
+from rest_framework.reverse import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.test import force_authenticate
+from orders.filters import OrderFilter
+from orders.models import Order
+from orders.views import OrderByEmailView
+
+
+@pytest.mark.usefixtures("db",
+                         "products_db", "orders_db",
+                         "regular_user", "member_of_staff")
+class OrderByEmailViewTest(APITestCase):
+    view = OrderByEmailView
+    factory = APIRequestFactory()
+
+    def get_orders(self, email, auth_user=None):
+        request = self.factory.get(reverse(self.view.name, kwargs={'email': email}))
+        if auth_user is not None:
+            force_authenticate(request, user=auth_user)
+        response = self.view.as_view()(request, email=email)
+        response.render()
+        return response
+
+    def test_anonymous_cant_look_up_orders_by_email(self):
+        response = self.get_orders('john.doe@example.com')
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_regular_user_cant_look_up_orders_by_email(self):
+        response = self.get_orders('john.doe@example.com', self.regular_user)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_staff_can_look_up_orders_by_email(self):
+        order = Order.objects.get(email='john.doe@example.com')
+        response = self.get_orders('John.Doe@Example.com', self.member_of_staff)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_200_OK
+        # Response Content
+        assert response.data['count'] == 1
+        assert response.data['results'][0]['id'] == order.pk
+
+    def test_non_ascii_emails_are_matched_as_stored(self):
+        order = Order.objects.get(pk=1)
+        order.email = 'Ægir.Doe@example.com'
+        order.save()
+        response = self.get_orders('Ægir.DOE@EXAMPLE.COM', self.member_of_staff)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_200_OK
+        # Response Content
+        assert response.data['count'] == 1
+        assert response.data['results'][0]['id'] == order.pk
+
+    def test_unknown_email_has_no_orders(self):
+        response = self.get_orders('jane.roe@example.com', self.member_of_staff)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_200_OK
+        # Response Content
+        assert response.data['count'] == 0
+
+
+@pytest.mark.usefixtures("db")
+class OrderSearchIndexTest(APITestCase):
+    def test_email_lookup_is_read_from_the_lower_email_index(self):
+        plan = Order.objects.by_email('John.Doe@Example.com').order_by('id').explain()
+
+        assert 'orders_email_lower_id_idx' in plan
+        assert 'TEMP B-TREE' not in plan
+
+    def test_exact_filters_are_read_from_indexes(self):
+        for field, value, index in (('email', 'john.doe@example.com', 'orders_email_id_idx'),
+                                    ('last_name', 'Doe', 'orders_last_name_id_idx'),
+                                    ('country', 'Latvia', 'orders_country_id_idx')):
+            plan = OrderFilter({field: value}, queryset=Order.objects.all()).qs.explain()
+
+            assert index in plan
+            assert 'TEMP B-TREE' not in plan
+
+
+@pytest.mark.slow
+@pytest.mark.usefixtures("db", "member_of_staff")
+class OrderByEmailBenchmark(APITestCase):
+    order_count = 200000
+
+    def test_order_by_email_benchmark(self):
+        Order.objects.bulk_create([
+            Order(first_name='Jane', last_name=f'Roe {n % 1000}', email=f'Customer.{n % 50000}@example.com',
+                  address='1 High Street', postal_code='AB1 2CD', city='Leeds', country=f'Country {n % 100}')
+            for n in range(self.order_count)
+        ], batch_size=5000)
+        email = 'customer.4242@EXAMPLE.com'
+        plan = Order.objects.by_email(email).order_by('id').explain()
+
+        request = APIRequestFactory().get(reverse(OrderByEmailView.name, kwargs={'email': email}))
+        force_authenticate(request, user=self.member_of_staff)
+        # the count and the page of orders
+        with self.assertNumQueries(2):
+            response = OrderByEmailView.as_view()(request, email=email)
+            response.render()
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == self.order_count // 50000
+        assert 'SEARCH orders_order USING INDEX orders_email_lower_id_idx' in plan
+        assert 'TEMP B-TREE' not in plan
@@ -0,0 +1,102 @@
+from decimal import Decimal
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.reverse import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.test import force_authenticate
+from orders.models import Order, OrderItem, OrderStatus
+from orders.views import OrderListView
+from products.models import Product, ProductStock
+
+
+@pytest.mark.usefixtures("db", "products_db", "regular_user", "member_of_staff", "store_administrator")
+class OrderCheckoutTest(APITestCase):
+    view = OrderListView
+    url = reverse(view.name)
+    factory = APIRequestFactory()
+    customer = {
+        'first_name': 'John', 'last_name': 'Doe',
+        'email': 'john.doe@example.com',
+        'address': '53 Mortimer Road',
+        'postal_code': 'N1 5AR',
+        'city': 'London',
+        'country': 'United Kingdom'
+    }
+
+    def place_order(self, items, auth_user=None):
+        request = self.factory.post(self.url, {**self.customer, 'items': items}, format='json')
+        force_authenticate(request, user=auth_user or self.store_administrator)
+        response = self.view.as_view()(request)
+        response.render()
+        return response
+
+    def test_regular_user_cant_place_orders(self):
+        response = self.place_order([{'product_id': 1, 'quantity': 1}], self.regular_user)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert Order.objects.count() == 0
+
+    def test_store_administrator_can_place_orders(self):
+        stock_entries_before_request = ProductStock.objects.count()
+
+        response = self.place_order([{'product_id': 1, 'quantity': 2}, {'product_id': 3, 'quantity': 5}])
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_201_CREATED
+        # Response Content
+        assert response.data['number_of_items'] == 2
+        assert response.data['total_cost'] == Decimal('17.00')
+
+        order = Order.objects.get(pk=response.data['id'])
+        assert order.email == self.customer['email']
+        assert (order.item_count, order.total_cost) == (2, Decimal('17.00'))
+        assert order.current_status == OrderStatus.CREATED
+        assert list(order.items.order_by('product_id').values_list('product_id', 'quantity', 'price')) == \
+            [(1, 2, Decimal('1.00')), (3, 5, Decimal('3.00'))]
+
+        # the stock of the ordered products is decreased, and recorded in the ledger
+        assert ProductStock.objects.count() == stock_entries_before_request + 2
+        for product_id, stock_size in ((1, 48), (2, 100), (3, 145)):
+            product = Product.objects.get(pk=product_id)
+            assert product.current_stock == stock_size
+            assert product.stock.latest('update_timestamp').stock_size == stock_size
+
+    def test_order_without_enough_stock_is_not_placed(self):
+        stock_entries_before_request = ProductStock.objects.count()
+
+        response = self.place_order([{'product_id': 1, 'quantity': 2}, {'product_id': 2, 'quantity': 101}])
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        # Response Content
+        assert response.data['items'] == ['Product 2: Not enough products in stock. Available stock: 100.00 item(s).']
+        # nothing is written
+        assert Order.objects.count() == 0
+        assert OrderItem.objects.count() == 0
+        assert ProductStock.objects.count() == stock_entries_before_request
+        assert Product.objects.get(pk=1).current_stock == 50
+
+    def test_invalid_items(self):
+        for items in ([], [{'product_id': 999, 'quantity': 1}], [{'product_id': 1, 'quantity': 0}],
+                      [{'product_id': 1, 'quantity': 1}, {'product_id': 1, 'quantity': 2}]):
+            response = self.place_order(items)
+
+            # Response Status Code
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+            assert 'items' in response.data
+        assert Order.objects.count() == 0
+
+    def test_checkout_query_count_does_not_depend_on_item_count(self):
+        def count_checkout_queries(items):
+            with CaptureQueriesContext(connection) as context:
+                response = self.place_order(items, self.member_of_staff)
+            assert response.status_code == status.HTTP_201_CREATED
+            return len(context.captured_queries)
+
+        queries_for_one_item = count_checkout_queries([{'product_id': 1, 'quantity': 1}])
+        assert count_checkout_queries([{'product_id': product_id, 'quantity': 1}
+                                       for product_id in (1, 2, 3)]) == queries_for_one_item
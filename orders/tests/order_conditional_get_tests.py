@@ -0,0 +1,140 @@
+from datetime import timedelta
+import pytest
+from django.utils import timezone
+from rest_framework.reverse import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.test import force_authenticate
+from orders.models import Order, OrderItem, OrderStatus
+from orders.views import OrderListView, OrderDetailView
+
+
+@pytest.mark.usefixtures("db", "products_db", "orders_db", "member_of_staff")
+class OrderConditionalGetTest(APITestCase):
+    order_pk = 1
+    factory = APIRequestFactory()
+
+    def get_order(self, **headers):
+        url = reverse(OrderDetailView.name, kwargs={'pk': self.order_pk})
+        request = self.factory.get(url, **headers)
+        force_authenticate(request, user=self.member_of_staff)
+        response = OrderDetailView.as_view()(request, pk=self.order_pk)
+        response.render()
+        return response
+
+    def test_unchanged_order_is_not_modified(self):
+        etag = self.get_order()['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.get_order(HTTP_IF_NONE_MATCH=etag)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        # Response Content
+        assert response.content == b''
+
+    def test_status_changes_modify_order(self):
+        etag = self.get_order()['ETag']
+
+        order_status = OrderStatus.objects.create(order_id=self.order_pk, status=OrderStatus.ACCEPTED)
+        response = self.get_order(HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        etag = response['ETag']
+
+        order_status.comment = 'Accepted by phone'
+        order_status.save()
+        assert self.get_order(HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    def test_ordered_product_changes_modify_order(self):
+        etag = self.get_order()['ETag']
+
+        product = Order.objects.get(pk=self.order_pk).items.first().product
+        product.name = 'Renamed Product'
+        product.save()
+
+        assert self.get_order(HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    def test_item_changes_modify_order(self):
+        etag = self.get_order()['ETag']
+
+        item = OrderItem.objects.filter(order_id=self.order_pk).first()
+        item.quantity += 5
+        item.save()
+        response = self.get_order(HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        etag = response['ETag']
+
+        # the same product and quantity ordered again, as a new item
+        item.delete()
+        OrderItem.objects.create(order_id=self.order_pk, product=item.product, quantity=item.quantity,
+                                 price=item.price)
+        assert self.get_order(HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    def test_missing_order(self):
+        self.order_pk = 999
+
+        # Response Status Code
+        assert self.get_order().status_code == status.HTTP_404_NOT_FOUND
+
+    def test_order_list_conditional_get(self):
+        url = reverse(OrderListView.name)
+
+        def get_orders(**headers):
+            request = self.factory.get(url, **headers)
+            force_authenticate(request, user=self.member_of_staff)
+            return OrderListView.as_view()(request)
+
+        etag = get_orders()['ETag']
+        assert get_orders(HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+
+        Order.objects.filter(pk=self.order_pk).delete()
+        assert get_orders(HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    def test_item_changes_modify_order_list(self):
+        url = reverse(OrderListView.name)
+
+        def get_orders(**headers):
+            request = self.factory.get(url, **headers)
+            force_authenticate(request, user=self.member_of_staff)
+            return OrderListView.as_view()(request)
+
+        etag = get_orders()['ETag']
+
+        item = OrderItem.objects.filter(order_id=self.order_pk).first()
+        item.quantity += 5
+        item.save()
+
+        assert get_orders(HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    def test_status_changes_modify_filtered_order_list(self):
+        url = reverse(OrderListView.name)
+
+        def get_orders(**headers):
+            request = self.factory.get(url, {'status': OrderStatus.ACCEPTED}, **headers)
+            force_authenticate(request, user=self.member_of_staff)
+            return OrderListView.as_view()(request)
+
+        def transition(order_id, new_status):
+            order = Order.objects.get(pk=order_id)
+            OrderStatus.objects.create_transition(
+                order_id=order_id,
+                current_status=order.current_status, current_status_timestamp=order.current_status_timestamp,
+                status=new_status,
+            )
+
+        transition(1, OrderStatus.ACCEPTED)
+        # neither the number of listed orders nor their latest update tell the lists apart
+        Order.objects.update(updated=timezone.now() - timedelta(days=1))
+        response = get_orders()
+        assert [order['id'] for order in response.data['results']] == [1]
+        etag = response['ETag']
+
+        transition(1, OrderStatus.SENT)
+        transition(2, OrderStatus.ACCEPTED)
+        response = get_orders(HTTP_IF_NONE_MATCH=etag)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_200_OK
+        # Response Content
+        assert [order['id'] for order in response.data['results']] == [2]
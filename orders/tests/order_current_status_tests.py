@@ -0,0 +1,98 @@
+from datetime import timedelta
+import pytest
+from django.utils import timezone
+from rest_framework.reverse import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.test import force_authenticate
+from orders.models import Order, OrderStatus
+from orders.views import OrderListView, OrderDetailView
+from orders.views import OrderStatusListCreateView, OrderStatusRetrieveUpdateDeleteView
+
+
+@pytest.mark.usefixtures("db", "products_db", "orders_db", "member_of_staff")
+class OrderCurrentStatusTest(APITestCase):
+    order_pk = 1
+    factory = APIRequestFactory()
+
+    def current_status(self, order_id=order_pk):
+        return Order.objects.filter(pk=order_id).values_list('current_status', flat=True).get()
+
+    def post_status(self, order_status):
+        url = reverse(OrderStatusListCreateView.name, kwargs={'order_id': self.order_pk})
+        request = self.factory.post(url, {'status': order_status}, format='json')
+        force_authenticate(request, user=self.member_of_staff)
+        return OrderStatusListCreateView.as_view()(request, order_id=self.order_pk)
+
+    def test_new_orders_are_created(self):
+        for order in Order.objects.all():
+            assert order.current_status == OrderStatus.CREATED
+            assert order.current_status_timestamp == order.statuses.get().create_timestamp
+
+    def test_posted_status_becomes_current(self):
+        self.post_status(OrderStatus.ACCEPTED)
+        response = self.post_status(OrderStatus.SENT)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_201_CREATED
+        assert self.current_status() == OrderStatus.SENT
+        # the other order is not affected
+        assert self.current_status(2) == OrderStatus.CREATED
+
+    def test_status_update_and_delete_change_current_status(self):
+        self.post_status(OrderStatus.ACCEPTED)
+        order_status = OrderStatus.objects.get(order_id=self.order_pk, status=OrderStatus.ACCEPTED)
+        url = reverse(OrderStatusRetrieveUpdateDeleteView.name, kwargs={'pk': order_status.pk})
+        view = OrderStatusRetrieveUpdateDeleteView.as_view()
+
+        # moving the status before the creation of the order makes 'Created' current again
+        data = {'order_id': self.order_pk, 'status': OrderStatus.ACCEPTED, 'comment': '',
+                'create_timestamp': (timezone.now() - timedelta(days=1)).isoformat()}
+        request = self.factory.put(url, data, format='json')
+        force_authenticate(request, user=self.member_of_staff)
+        assert view(request, pk=order_status.pk).status_code == status.HTTP_200_OK
+        assert self.current_status() == OrderStatus.CREATED
+
+        created_status = OrderStatus.objects.get(order_id=self.order_pk, status=OrderStatus.CREATED)
+        request = self.factory.delete(url)
+        force_authenticate(request, user=self.member_of_staff)
+        response = view(request, pk=created_status.pk)
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert self.current_status() == OrderStatus.ACCEPTED
+
+        OrderStatus.objects.filter(order_id=self.order_pk).delete()
+        assert self.current_status() is None
+
+    def test_orders_can_be_filtered_by_current_status(self):
+        self.post_status(OrderStatus.ACCEPTED)
+        self.post_status(OrderStatus.SENT)
+
+        request = self.factory.get(reverse(OrderListView.name), {'status': OrderStatus.SENT})
+        force_authenticate(request, user=self.member_of_staff)
+        response = OrderListView.as_view()(request)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_200_OK
+        # Response Content
+        assert [order['id'] for order in response.data['results']] == [self.order_pk]
+
+    def test_unknown_status_filter(self):
+        request = self.factory.get(reverse(OrderListView.name), {'status': 'Q'})
+        force_authenticate(request, user=self.member_of_staff)
+        response = OrderListView.as_view()(request)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_order_details_show_current_status(self):
+        for order_status in (OrderStatus.ACCEPTED, OrderStatus.SENT, OrderStatus.DELIVERED):
+            self.post_status(order_status)
+
+        url = reverse(OrderDetailView.name, kwargs={'pk': self.order_pk})
+        request = self.factory.get(url)
+        force_authenticate(request, user=self.member_of_staff)
+        response = OrderDetailView.as_view()(request, pk=self.order_pk)
+
+        # Response Content
+        assert response.data['recent_status'] == 'Delivered'
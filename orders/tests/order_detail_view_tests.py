@@ -5,9 +5,10 @@ from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
 from rest_framework.test import APIRequestFactory
 from rest_framework.test import force_authenticate
-from orders.models import Order
+from orders.models import Order, OrderItem, OrderStatus
 from orders.serializers import OrderDetailSerializer
 from orders.views import OrderDetailView
+from products.models import Product
 
 
 @pytest.mark.usefixtures("db",
@@ -79,3 +80,28 @@ class OrderDetailViewTest(APITestCase):
         order_serializer = OrderDetailSerializer(order_object)
         order_json = JSONRenderer().render(order_serializer.data)
         assert response.content == order_json
+
+    def test_order_details_query_count_does_not_depend_on_item_count(self):
+        view = self.view.as_view()
+        for i in range(10, 20):
+            product = Product.objects.create(name=f'Test-Product-{i}', code=f'TP-{i}', price=i, unit='item')
+            OrderItem.objects.create(order_id=self.order_pk, product=product, quantity=2)
+        OrderStatus.objects.create(order_id=self.order_pk, status=OrderStatus.ACCEPTED)
+
+        request = self.factory.get(self.url)
+        force_authenticate(request, user=self.member_of_staff)
+        # the order with its versions, its items with their products, and its statuses
+        with self.assertNumQueries(3):
+            response = view(request, pk=self.order_pk)
+            response.render()
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_200_OK
+
+        # Response Content
+        order_object = Order.objects.get(pk=self.order_pk)
+        order_serializer = OrderDetailSerializer(order_object)
+        order_json = JSONRenderer().render(order_serializer.data)
+        assert response.content == order_json
+        assert len(response.data['items']) == 13
+        assert response.data['recent_status'] == 'Accepted'
@@ -0,0 +1,107 @@
+import csv
+import json
+import pytest
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from rest_framework.reverse import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.test import force_authenticate
+from orders.models import Order, OrderStatus
+from orders.views import OrderExportView
+
+
+@pytest.mark.usefixtures("db",
+                         "products_db", "orders_db",
+                         "regular_user", "member_of_staff", "store_administrator")
+class OrderExportViewTest(APITestCase):
+    view = OrderExportView
+    url = reverse(view.name)
+    factory = APIRequestFactory()
+
+    def export(self, params=None, user=None):
+        view = self.view.as_view()
+        request = self.factory.get(self.url, params)
+        force_authenticate(request, user=user or self.store_administrator)
+        return view(request)
+
+    def test_regular_user_cant_export_orders(self):
+        response = self.export(user=self.regular_user)
+        response.render()
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_orders_are_exported_as_ndjson(self):
+        order = Order.objects.first()
+        OrderStatus.objects.create(order=order, status=OrderStatus.ACCEPTED)
+
+        response = self.export()
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'application/x-ndjson'
+
+        # Response Content
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        orders = [json.loads(line) for line in lines]
+        assert [item['id'] for item in orders] == list(Order.objects.order_by('pk').values_list('pk', flat=True))
+        assert orders[0]['status'] == 'Accepted'
+        assert orders[1]['status'] == 'Created'
+        assert len(orders[0]['items']) == order.number_of_items
+        assert orders[0]['total_cost'] == str(order.total_cost)
+
+    def test_orders_are_exported_as_csv(self):
+        response = self.export({'output': 'csv'})
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'text/csv'
+
+        # Response Content: one line per order item
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(StringIO(content)))
+        assert len(rows) == sum(order.number_of_items for order in Order.objects.all())
+        assert {row['product_code'] for row in rows} == {'TP-1', 'TP-2', 'TP-3'}
+
+    def test_export_accepts_order_list_filters(self):
+        order = Order.objects.first()
+
+        response = self.export({'last_name': order.last_name})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+
+        assert [json.loads(line)['id'] for line in lines] == [order.pk]
+
+    def test_date_range_is_exported_in_created_order(self):
+        first_order, second_order = Order.objects.order_by('pk')
+        created = datetime(2021, 6, 1, 12, tzinfo=timezone.utc)
+        Order.objects.filter(pk=second_order.pk).update(created=created)
+        Order.objects.filter(pk=first_order.pk).update(created=created + timedelta(days=1))
+
+        response = self.export({'created_from': '2021-06-01T00:00Z', 'created_to': '2021-06-30T00:00Z'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert [json.loads(line)['id'] for line in lines] == [second_order.pk, first_order.pk]
+
+        response = self.export({'created_from': '2021-06-01T00:00Z', 'created_to': '2021-06-01T23:59Z'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert [json.loads(line)['id'] for line in lines] == [second_order.pk]
+
+    def test_date_range_is_read_from_the_created_index(self):
+        plan = (Order.objects
+                .filter(created__gte=datetime(2021, 6, 1, tzinfo=timezone.utc),
+                        created__lte=datetime(2021, 6, 30, tzinfo=timezone.utc))
+                .order_by('created', 'pk')
+                .explain())
+
+        assert 'orders_created_id_idx' in plan
+        assert 'TEMP B-TREE' not in plan
+
+    def test_unsupported_output_format(self):
+        response = self.export({'output': 'xml'})
+        response.render()
+
+        # Response Content
+        assert response.content == b'"Unsupported output format: xml"'
+        # Response Status Code
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
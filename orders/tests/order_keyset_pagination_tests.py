@@ -0,0 +1,32 @@
+import pytest
+from rest_framework.reverse import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.test import force_authenticate
+from orders.models import Order
+from orders.views import OrderListView
+
+
+@pytest.mark.usefixtures("db", "products_db", "orders_db", "member_of_staff")
+class OrderKeysetPaginationTest(APITestCase):
+    view = OrderListView
+    url = reverse(view.name)
+    factory = APIRequestFactory()
+
+    def test_pages_follow_request_ordering(self):
+        for order in Order.objects.all():
+            Order.objects.create(first_name=order.first_name, last_name=order.last_name, email=order.email,
+                                 address=order.address, postal_code=order.postal_code, city=order.city,
+                                 country=order.country)
+
+        ids = []
+        request = self.factory.get(self.url, {'cursor': '', 'limit': 1, 'ordering': '-created'})
+        while request is not None:
+            force_authenticate(request, user=self.member_of_staff)
+            response = self.view.as_view()(request)
+            assert response.status_code == status.HTTP_200_OK
+            ids += [order['id'] for order in response.data['results']]
+            request = self.factory.get(response.data['next']) if response.data['next'] else None
+
+        assert ids == list(Order.objects.order_by('-created', '-pk').values_list('pk', flat=True))
@@ -0,0 +1,84 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.reverse import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.test import force_authenticate
+from orders.models import Order, OrderItem
+from orders.views import OrderListView
+from products.models import Product
+
+
+@pytest.mark.usefixtures("db", "products_db", "orders_db", "member_of_staff")
+class OrderListTotalsTest(APITestCase):
+    view = OrderListView
+    url = reverse(view.name)
+    factory = APIRequestFactory()
+
+    def get_orders(self, params=None):
+        request = self.factory.get(self.url, params)
+        force_authenticate(request, user=self.member_of_staff)
+        response = self.view.as_view()(request)
+        response.render()
+        return response
+
+    def add_order(self, quantity):
+        order = Order.objects.create(first_name='Jane', last_name='Roe', email='jane.roe@example.com',
+                                     address='1 High Street', postal_code='AB1 2CD', city='Leeds',
+                                     country='United Kingdom')
+        OrderItem.objects.create(order=order, product=Product.objects.get(code='TP-2'), quantity=quantity)
+        return order
+
+    def test_totals_are_computed_by_the_database(self):
+        response = self.get_orders()
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_200_OK
+        # Response Content
+        for order_data in response.data['results']:
+            order = Order.objects.get(pk=order_data['id'])
+            assert order_data['number_of_items'] == order.number_of_items
+            assert order_data['total_cost'] == order.total_cost
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as context:
+                assert self.get_orders().status_code == status.HTTP_200_OK
+            return len(context.captured_queries)
+
+        queries_for_two_orders = count_queries()
+        for quantity in range(1, 6):
+            self.add_order(quantity)
+        assert count_queries() == queries_for_two_orders
+
+    def test_ordering_and_filtering_by_total_cost(self):
+        large_order = self.add_order(10)
+        small_order = self.add_order(1)
+
+        response = self.get_orders({'ordering': '-total_cost', 'min_total': 5})
+        ids = [order['id'] for order in response.data['results']]
+        assert ids[0] == large_order.pk
+        assert small_order.pk not in ids
+        assert len(ids) == 3
+
+        response = self.get_orders({'max_total': 5})
+        assert [order['id'] for order in response.data['results']] == [small_order.pk]
+
+    def test_cursor_pagination_by_total_cost(self):
+        for quantity in (3, 1, 2):
+            self.add_order(quantity)
+
+        ids = []
+        response = self.get_orders({'ordering': '-total_cost', 'cursor': '', 'limit': 2})
+        while True:
+            assert response.status_code == status.HTTP_200_OK
+            ids += [order['id'] for order in response.data['results']]
+            if response.data['next'] is None:
+                break
+            request = self.factory.get(response.data['next'])
+            force_authenticate(request, user=self.member_of_staff)
+            response = self.view.as_view()(request)
+
+        assert ids == list(Order.objects.order_by('-total_cost', '-pk').values_list('pk', flat=True))
@@ -0,0 +1,242 @@
+import datetime
+from decimal import Decimal
+from io import StringIO
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.reverse import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.test import force_authenticate
+from orders.models import Order, OrderItem, OrderStatus, DailyCountrySales, DailyProductSales
+from orders.views import DailySalesView, DailyProductSalesView
+from products.models import Product
+
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+@pytest.mark.usefixtures("db", "products_db", "orders_db")
+class SalesRollupTest(APITestCase):
+    def country_sales(self):
+        return list(DailyCountrySales.objects.values_list('day', 'country', 'order_count', 'item_count', 'revenue'))
+
+    def product_sales(self, code):
+        return list(DailyProductSales.objects
+                    .filter(product__code=code)
+                    .values_list('day', 'quantity', 'revenue', 'order_count'))
+
+    def test_orders_are_rolled_up(self):
+        today = timezone.localdate()
+
+        assert self.country_sales() == [(today, 'United Kingdom', 2, 6, Decimal('12.00'))]
+        assert self.product_sales('TP-3') == [(today, 2, Decimal('6.00'), 2)]
+
+    def test_item_writes_update_rollups(self):
+        today = timezone.localdate()
+        item = OrderItem.objects.filter(order_id=1, product__code='TP-3').get()
+        item.quantity = 4
+        item.save()
+
+        assert self.country_sales() == [(today, 'United Kingdom', 2, 6, Decimal('21.00'))]
+        assert self.product_sales('TP-3') == [(today, 5, Decimal('15.00'), 2)]
+
+        OrderItem.objects.filter(product__code='TP-3').delete()
+
+        assert self.country_sales() == [(today, 'United Kingdom', 2, 4, Decimal('6.00'))]
+        # no orders contribute to the row anymore
+        assert self.product_sales('TP-3') == []
+
+    def test_bulk_item_writes_update_rollups(self):
+        today = timezone.localdate()
+        product = Product.objects.get(code='TP-2')
+        OrderItem.objects.bulk_create([OrderItem(order_id=1, product=product, price=product.price, quantity=2)])
+
+        assert self.product_sales('TP-2') == [(today, 4, Decimal('8.00'), 2)]
+
+        OrderItem.objects.filter(product__code='TP-2').update(quantity=1)
+
+        assert self.product_sales('TP-2') == [(today, 3, Decimal('6.00'), 2)]
+
+    def test_cancelled_orders_are_excluded(self):
+        today = timezone.localdate()
+        cancellation = OrderStatus.objects.create(order_id=1, status=OrderStatus.CANCELLED)
+
+        assert self.country_sales() == [(today, 'United Kingdom', 1, 3, Decimal('6.00'))]
+        assert self.product_sales('TP-3') == [(today, 1, Decimal('3.00'), 1)]
+
+        # item changes of a cancelled order do not count
+        OrderItem.objects.filter(order_id=1).update(quantity=5)
+        assert self.product_sales('TP-3') == [(today, 1, Decimal('3.00'), 1)]
+
+        cancellation.delete()
+
+        assert self.country_sales() == [(today, 'United Kingdom', 2, 6, Decimal('36.00'))]
+        assert self.product_sales('TP-3') == [(today, 6, Decimal('18.00'), 2)]
+
+    def test_order_changes_update_rollups(self):
+        today = timezone.localdate()
+        order = Order.objects.get(pk=1)
+        order.country = 'Ireland'
+        order.save()
+
+        assert self.country_sales() == [(today, 'Ireland', 1, 3, Decimal('6.00')),
+                                        (today, 'United Kingdom', 1, 3, Decimal('6.00'))]
+
+        order.delete()
+
+        assert self.country_sales() == [(today, 'United Kingdom', 1, 3, Decimal('6.00'))]
+        assert self.product_sales('TP-3') == [(today, 1, Decimal('3.00'), 1)]
+
+    def test_bulk_order_changes_update_rollups(self):
+        today = timezone.localdate()
+        Order.objects.filter(pk=1).update(country='Ireland')
+
+        assert self.country_sales() == [(today, 'Ireland', 1, 3, Decimal('6.00')),
+                                        (today, 'United Kingdom', 1, 3, Decimal('6.00'))]
+
+        last_week = timezone.now() - datetime.timedelta(days=7)
+        Order.objects.filter(pk=1).update(created=last_week)
+
+        assert self.country_sales() == [(timezone.localdate(last_week), 'Ireland', 1, 3, Decimal('6.00')),
+                                        (today, 'United Kingdom', 1, 3, Decimal('6.00'))]
+        assert self.product_sales('TP-3') == [(timezone.localdate(last_week), 1, Decimal('3.00'), 1),
+                                              (today, 1, Decimal('3.00'), 1)]
+
+    def test_product_delete_updates_rollups(self):
+        today = timezone.localdate()
+        Product.objects.get(code='TP-3').delete()
+
+        assert self.country_sales() == [(today, 'United Kingdom', 2, 4, Decimal('6.00'))]
+        assert self.product_sales('TP-2') == [(today, 2, Decimal('4.00'), 2)]
+
+    def test_rebuild_command_restores_rollups(self):
+        country_sales = self.country_sales()
+        product_sales = self.product_sales('TP-3')
+        DailyCountrySales.objects.update(revenue=0)
+        DailyProductSales.objects.filter(product__code='TP-3').delete()
+        DailyCountrySales.objects.create(day=datetime.date(2000, 1, 1), country='Ireland', order_count=1)
+
+        out = StringIO()
+        call_command('rebuild_sales_rollups', '--batch-days', '1', stdout=out)
+
+        assert self.country_sales() == country_sales
+        assert self.product_sales('TP-3') == product_sales
+        assert 'Sales rollups rebuilt with 4 row(s).' in out.getvalue()
+
+
+@pytest.mark.usefixtures("db",
+                         "products_db", "orders_db",
+                         "regular_user", "member_of_staff")
+class DailySalesViewTest(APITestCase):
+    factory = APIRequestFactory()
+
+    def get_sales(self, view, url, data=None, auth_user=None, **kwargs):
+        request = self.factory.get(url, data)
+        if auth_user is not None:
+            force_authenticate(request, user=auth_user)
+        response = view.as_view()(request, **kwargs)
+        response.render()
+        return response
+
+    def test_anonymous_cant_view_daily_sales(self):
+        response = self.get_sales(DailySalesView, reverse(DailySalesView.name))
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_regular_user_cant_view_daily_sales(self):
+        response = self.get_sales(DailySalesView, reverse(DailySalesView.name), auth_user=self.regular_user)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_staff_can_view_a_year_of_daily_sales(self):
+        today = timezone.localdate()
+        response = self.get_sales(DailySalesView, reverse(DailySalesView.name), auth_user=self.member_of_staff)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_200_OK
+        # Response Content
+        assert response.data['since'] == today - datetime.timedelta(days=364)
+        assert response.data['until'] == today
+        assert len(response.data['days']) == 365
+        assert response.data['days'][0] == {'day': str(today - datetime.timedelta(days=364)),
+                                            'order_count': 0, 'item_count': 0, 'revenue': '0.00'}
+        assert response.data['days'][-1] == {'day': str(today),
+                                             'order_count': 2, 'item_count': 6, 'revenue': '12.00'}
+
+    def test_daily_sales_of_a_country(self):
+        today = str(timezone.localdate())
+        response = self.get_sales(DailySalesView, reverse(DailySalesView.name),
+                                  {'since': today, 'until': today, 'country': 'Ireland'},
+                                  auth_user=self.member_of_staff)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_200_OK
+        # Response Content
+        assert response.data['days'] == [{'day': today, 'order_count': 0, 'item_count': 0, 'revenue': '0.00'}]
+
+    def test_daily_sales_of_a_product(self):
+        today = str(timezone.localdate())
+        product = Product.objects.get(code='TP-2')
+        response = self.get_sales(DailyProductSalesView,
+                                  reverse(DailyProductSalesView.name, kwargs={'product_id': product.pk}),
+                                  {'since': today, 'until': today},
+                                  auth_user=self.member_of_staff, product_id=product.pk)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_200_OK
+        # Response Content
+        assert response.data['days'] == [{'day': today, 'quantity': 2, 'revenue': '4.00', 'order_count': 2}]
+
+    def test_daily_sales_range_is_limited(self):
+        response = self.get_sales(DailySalesView, reverse(DailySalesView.name),
+                                  {'since': '2020-01-01', 'until': '2022-01-01'},
+                                  auth_user=self.member_of_staff)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        # Response Content
+        assert response.data == {'since': ['A report can cover at most 366 days.']}
+
+
+@pytest.mark.slow
+@pytest.mark.usefixtures("db", "member_of_staff")
+class DailySalesBenchmark(APITestCase):
+    countries = 50
+
+    def test_daily_sales_benchmark(self):
+        today = timezone.localdate()
+        DailyCountrySales.objects.bulk_create([
+            DailyCountrySales(day=today - datetime.timedelta(days=n), country=f'Country {c}',
+                              order_count=10, item_count=30, revenue=Decimal('125.50'))
+            for n in range(365) for c in range(self.countries)
+        ], batch_size=500)
+
+        def read_sales(**params):
+            request = APIRequestFactory().get(reverse(DailySalesView.name), params)
+            force_authenticate(request, user=self.member_of_staff)
+            with CaptureQueriesContext(connection) as queries:
+                response = DailySalesView.as_view()(request)
+            assert response.status_code == status.HTTP_200_OK
+            assert len(queries) == 1
+            return response, query_plan(queries[0]['sql'])
+
+        # a year of days is a range of the (day, country) index, already in day order
+        response, plan = read_sales()
+        assert response.data['days'][-1]['order_count'] == 10 * self.countries
+        assert len(plan) == 1
+        assert plan[0].startswith('SEARCH orders_dailycountrysales USING INDEX orders_dailycountrysales_day_country')
+        assert plan[0].endswith('(day>? AND day<?)')
+
+        response, plan = read_sales(country='Country 7')
+        assert response.data['days'][-1]['order_count'] == 10
+        assert plan == ['SEARCH orders_dailycountrysales USING INDEX orders_country_sales_idx '
+                        '(country=? AND day>? AND day<?)']
@@ -0,0 +1,135 @@
+import math
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.reverse import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.test import force_authenticate
+from config.exports import IN_CLAUSE_CHUNK_SIZE
+from orders.models import Order, OrderStatus
+from orders.views import OrderStatusBulkCreateView
+
+
+@pytest.mark.usefixtures("db",
+                         "products_db", "orders_db",
+                         "regular_user", "member_of_staff", "store_administrator")
+class OrderStatusBulkCreateViewTest(APITestCase):
+    view = OrderStatusBulkCreateView
+    url = reverse(view.name)
+    factory = APIRequestFactory()
+
+    def post_status_changes(self, status_changes, auth_user=None):
+        view = self.view.as_view()
+        request = self.factory.post(self.url, status_changes, format='json')
+        if auth_user is not None:
+            force_authenticate(request, user=auth_user)
+        response = view(request)
+        response.render()
+        return response
+
+    def test_anonymous_cant_change_statuses_in_bulk(self):
+        response = self.post_status_changes([{"order_id": 1, "status": OrderStatus.ACCEPTED}])
+
+        # Response Content
+        assert response.content == b'{"detail":"Authentication credentials were not provided."}'
+        # Response Status Code
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_regular_user_cant_change_statuses_in_bulk(self):
+        response = self.post_status_changes([{"order_id": 1, "status": OrderStatus.ACCEPTED}], self.regular_user)
+
+        # Response Content
+        assert response.content == b'{"detail":"You do not have permission to perform this action."}'
+        # Response Status Code
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_store_administrator_can_change_statuses_in_bulk(self):
+        status_changes = [
+            {"order_id": 1, "status": OrderStatus.ACCEPTED, "comment": "Paid"},
+            {"order_id": 2, "status": OrderStatus.CANCELLED},
+        ]
+        response = self.post_status_changes(status_changes, self.store_administrator)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_201_CREATED
+        # Response Content
+        assert [result['result'] for result in response.data] == ['created', 'created']
+
+        assert OrderStatus.objects.get(order_id=1, status=OrderStatus.ACCEPTED).comment == 'Paid'
+        for order in Order.objects.all():
+            latest_status = order.statuses.latest('create_timestamp')
+            assert order.current_status == latest_status.status
+            assert order.current_status_timestamp == latest_status.create_timestamp
+
+    def test_invalid_status_changes_are_rejected_individually(self):
+        Order.objects.create(first_name='Jane', last_name='Roe', email='jane.roe@example.com',
+                             address='1 High Street', postal_code='AB1 2CD', city='Leeds',
+                             country='United Kingdom')
+        OrderStatus.objects.create(order_id=2, status=OrderStatus.CANCELLED)
+        # the order already had the accepted status, which was removed since
+        OrderStatus.objects.create(order_id=3, status=OrderStatus.ACCEPTED, create_timestamp='2000-01-01T00:00Z')
+        statuses_before_request = OrderStatus.objects.count()
+
+        status_changes = [
+            {"order_id": 1, "status": OrderStatus.DELIVERED},
+            {"order_id": 2, "status": OrderStatus.SENT},
+            {"order_id": 999, "status": OrderStatus.ACCEPTED},
+            {"order_id": 3, "status": OrderStatus.ACCEPTED},
+            {"order_id": 1, "status": OrderStatus.ACCEPTED},
+            {"order_id": 1, "status": "Q"},
+        ]
+        response = self.post_status_changes(status_changes, self.store_administrator)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_207_MULTI_STATUS
+        # Response Content
+        assert [result['result'] for result in response.data] == ['rejected'] * 6
+        assert response.data[0]['error'] == 'Order status can not change from Created to Delivered'
+        assert response.data[1]['error'] == 'Cancelled order can not obtain a new status'
+        assert response.data[2]['error'] == 'Order does not exist.'
+        assert response.data[3]['error'] == 'Order already had the Accepted status'
+        assert response.data[4]['error'] == 'Duplicate order_id in request.'
+        assert 'status' in response.data[5]['error']
+
+        # Nothing was written
+        assert OrderStatus.objects.count() == statuses_before_request
+        assert Order.objects.get(pk=1).current_status == OrderStatus.CREATED
+
+    def test_bad_request_data(self):
+        response = self.post_status_changes({"order_id": 1, "status": OrderStatus.ACCEPTED},
+                                            self.store_administrator)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.slow
+@pytest.mark.usefixtures("db", "member_of_staff")
+class OrderStatusBulkCreateBenchmark(APITestCase):
+    order_count = 5000
+
+    def test_bulk_status_benchmark(self):
+        Order.objects.bulk_create([
+            Order(first_name='Jane', last_name=f'Roe {n}', email='jane.roe@example.com', address='1 High Street',
+                  postal_code='AB1 2CD', city='Leeds', country='United Kingdom')
+            for n in range(self.order_count)
+        ])
+        orders = list(Order.objects.all())
+        OrderStatus.objects.bulk_create([OrderStatus(order=order, status=OrderStatus.ACCEPTED) for order in orders])
+
+        request = APIRequestFactory().post(
+            reverse(OrderStatusBulkCreateView.name),
+            [{'order_id': order.pk, 'status': OrderStatus.SENT, 'comment': 'Dispatched'} for order in orders],
+            format='json'
+        )
+        force_authenticate(request, user=self.member_of_staff)
+        with CaptureQueriesContext(connection) as queries:
+            response = OrderStatusBulkCreateView.as_view()(request)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Order.objects.filter(current_status=OrderStatus.SENT).count() == self.order_count
+        # the orders are read and written a chunk at a time, with a few queries per chunk
+        chunks = math.ceil(self.order_count / IN_CLAUSE_CHUNK_SIZE)
+        assert len(queries) <= 15 * chunks
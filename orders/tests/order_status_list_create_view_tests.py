@@ -7,7 +7,7 @@ from rest_framework.test import APIRequestFactory
 from rest_framework.test import force_authenticate
 from orders.models import Order, OrderStatus
 from orders.serializers import OrderStatusSerializer
-from orders.views import OrderStatusListCreateView
+from orders.views import OrderStatusListCreateView, OrderStatusRetrieveUpdateDeleteView
 
 
 @pytest.mark.usefixtures("db",
@@ -134,6 +134,35 @@ class OrderStatusListCreateViewTest(APITestCase):
         current_status = status_order_entries_before.latest('create_timestamp')
         assert current_status.status == OrderStatus.ACCEPTED
 
+    def test_created_order_status_can_be_retrieved(self):
+        new_status_data = {
+            "order_id": self.order_id,
+            "status": OrderStatus.ACCEPTED,
+            "comment": "Order Accepted"
+        }
+
+        request = self.factory.post(self.url, new_status_data)
+        force_authenticate(request, user=self.member_of_staff)
+        response = self.view.as_view()(request, order_id=self.order_id)
+        response.render()
+
+        # Response Code
+        assert response.status_code == status.HTTP_201_CREATED
+        # Response Content
+        assert response.data['id'] is not None
+
+        request = self.factory.get(reverse(OrderStatusRetrieveUpdateDeleteView.name,
+                                           kwargs={'pk': response.data['id']}))
+        force_authenticate(request, user=self.member_of_staff)
+        retrieve_response = OrderStatusRetrieveUpdateDeleteView.as_view()(request, pk=response.data['id'])
+        retrieve_response.render()
+
+        # Response Code
+        assert retrieve_response.status_code == status.HTTP_200_OK
+        # Response Content
+        assert retrieve_response.data['status'] == OrderStatus.ACCEPTED
+        assert retrieve_response.data['comment'] == "Order Accepted"
+
     def test_store_administrator_can_view_order_status_list(self):
         view = self.view.as_view()
         auth_user = self.store_administrator
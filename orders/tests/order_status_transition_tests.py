@@ -0,0 +1,89 @@
+from datetime import timedelta
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.reverse import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.test import force_authenticate
+from orders.models import Order, OrderStatus
+from orders.views import OrderStatusListCreateView
+
+
+@pytest.mark.usefixtures("db", "products_db", "orders_db", "member_of_staff")
+class OrderStatusTransitionTest(APITestCase):
+    view = OrderStatusListCreateView
+    order_id = 1
+    url = reverse(view.name, kwargs={'order_id': str(order_id)})
+    factory = APIRequestFactory()
+
+    def post_status(self, order_status, **data):
+        request = self.factory.post(self.url, {'status': order_status, **data}, format='json')
+        force_authenticate(request, user=self.member_of_staff)
+        response = self.view.as_view()(request, order_id=self.order_id)
+        response.render()
+        return response
+
+    def test_order_goes_through_its_statuses(self):
+        for order_status in (OrderStatus.ACCEPTED, OrderStatus.SENT, OrderStatus.DELIVERED, OrderStatus.CLOSED):
+            response = self.post_status(order_status)
+
+            # Response Status Code
+            assert response.status_code == status.HTTP_201_CREATED
+            # Response Content
+            assert response.data['status'] == order_status
+            order = Order.objects.get(pk=self.order_id)
+            assert order.current_status == order_status
+            assert order.current_status_timestamp == order.statuses.latest('create_timestamp').create_timestamp
+
+        assert self.post_status(OrderStatus.SENT).status_code == status.HTTP_403_FORBIDDEN
+
+    def test_illegal_transition_is_a_conflict(self):
+        response = self.post_status(OrderStatus.DELIVERED)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_409_CONFLICT
+        # Response Content
+        assert response.content == b'"Order status can not change from Created to Delivered"'
+        assert OrderStatus.objects.filter(order_id=self.order_id).count() == 1
+
+    def test_unknown_status(self):
+        response = self.post_status('Q')
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert OrderStatus.objects.filter(order_id=self.order_id).count() == 1
+
+    def test_status_older_than_current_status_is_a_conflict(self):
+        create_timestamp = (timezone.now() - timedelta(days=1)).isoformat()
+        response = self.post_status(OrderStatus.ACCEPTED, create_timestamp=create_timestamp)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert Order.objects.get(pk=self.order_id).current_status == OrderStatus.CREATED
+
+    def test_transition_reads_the_order_once(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.post_status(OrderStatus.ACCEPTED)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        statements = [query['sql'].split()[0] for query in context.captured_queries
+                      if 'SAVEPOINT' not in query['sql']]
+        assert statements == ['SELECT', 'UPDATE', 'INSERT']
+
+    def test_transition_from_a_changed_status_is_not_created(self):
+        order = Order.objects.get(pk=self.order_id)
+        OrderStatus.objects.create(order=order, status=OrderStatus.ACCEPTED)
+
+        # the order was read while it was still only created
+        order_status = OrderStatus.objects.create_transition(
+            order_id=self.order_id,
+            current_status=order.current_status, current_status_timestamp=order.current_status_timestamp,
+            status=OrderStatus.CANCELLED,
+        )
+
+        assert order_status is None
+        assert Order.objects.get(pk=self.order_id).current_status == OrderStatus.ACCEPTED
+        assert not OrderStatus.objects.filter(order_id=self.order_id, status=OrderStatus.CANCELLED).exists()
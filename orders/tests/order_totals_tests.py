@@ -0,0 +1,100 @@
+from decimal import Decimal
+from io import StringIO
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+from orders.models import Order, OrderItem
+from products.models import Product
+
+
+@pytest.mark.usefixtures("db", "products_db", "orders_db")
+class OrderTotalsTest(APITestCase):
+    def totals(self, order_id):
+        return Order.objects.filter(pk=order_id).values_list('item_count', 'total_cost').get()
+
+    def test_orders_have_totals_of_their_items(self):
+        for order in Order.objects.all():
+            assert order.item_count == 3
+            assert order.total_cost == 6
+
+    def test_item_save_updates_totals(self):
+        item = OrderItem.objects.filter(order_id=1, product__code='TP-3').get()
+        item.quantity = 4
+        item.save()
+
+        assert self.totals(1) == (3, Decimal('15.00'))
+        # the other order is not affected
+        assert self.totals(2) == (3, Decimal('6.00'))
+
+    def test_moving_an_item_updates_both_orders(self):
+        item = OrderItem.objects.filter(order_id=1, product__code='TP-1').get()
+        item.order_id = 2
+        item.save()
+
+        assert self.totals(1) == (2, Decimal('5.00'))
+        assert self.totals(2) == (4, Decimal('7.00'))
+
+    def test_item_delete_updates_totals(self):
+        OrderItem.objects.filter(order_id=1, product__code='TP-3').get().delete()
+
+        assert self.totals(1) == (2, Decimal('3.00'))
+
+    def test_bulk_writes_update_totals(self):
+        products = Product.objects.all()
+        OrderItem.objects.bulk_create([
+            OrderItem(order_id=1, product=product, price=product.price, quantity=2) for product in products
+        ])
+        assert self.totals(1) == (6, Decimal('18.00'))
+
+        OrderItem.objects.filter(order_id=1).update(quantity=1)
+        assert self.totals(1) == (6, Decimal('12.00'))
+
+        OrderItem.objects.filter(order_id=1).delete()
+        assert self.totals(1) == (0, Decimal('0.00'))
+
+    def test_order_save_keeps_totals(self):
+        order = Order.objects.get(pk=1)
+        OrderItem.objects.filter(order_id=1, product__code='TP-3').update(quantity=3)
+
+        # the instance holds stale totals, saving it must not write them back
+        order.city = 'Manchester'
+        order.save()
+
+        assert self.totals(1) == (3, Decimal('12.00'))
+
+    def test_rebuild_order_totals_command(self):
+        Order.objects.update(item_count=0, total_cost=999)
+
+        call_command('rebuild_order_totals', batch_size=1, stdout=StringIO())
+
+        assert self.totals(1) == (3, Decimal('6.00'))
+        assert self.totals(2) == (3, Decimal('6.00'))
+
+    def test_rebuild_order_totals_check(self):
+        Order.objects.filter(pk=2).update(total_cost=999)
+
+        output = StringIO()
+        call_command('rebuild_order_totals', check=True, stdout=output)
+
+        assert 'Order 2: 3 item(s) for 999.00' in output.getvalue()
+        assert '1 order(s) with stale totals.' in output.getvalue()
+        # checking does not modify anything
+        assert self.totals(2) == (3, Decimal('999.00'))
+
+    def test_item_totals_are_computed_from_the_items(self):
+        OrderItem.objects.filter(order_id=2).delete()
+        Order.objects.filter(pk=2).update(total_cost=999)
+
+        item_totals = Order.objects.with_item_totals().order_by('pk').values_list('items_count', 'items_total')
+        assert list(item_totals) == [(3, Decimal('6.00')), (0, Decimal('0.00'))]
+
+        output = StringIO()
+        call_command('rebuild_order_totals', check=True, stdout=output)
+        assert 'Order 2: 0 item(s) for 999.00, order items 0 item(s) for 0.' in output.getvalue()
+
+    def test_product_delete_updates_totals(self):
+        # the items of the product are deleted with it
+        Product.objects.get(code='TP-3').delete()
+
+        assert self.totals(1) == (2, Decimal('3.00'))
+        assert self.totals(2) == (2, Decimal('3.00'))
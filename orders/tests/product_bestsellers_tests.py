@@ -0,0 +1,136 @@
+import datetime
+from decimal import Decimal
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.reverse import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.test import force_authenticate
+from orders.models import Order, OrderItem, DailyProductSales
+from orders.views import ProductBestsellersView
+from products.models import Product
+
+
+@pytest.mark.usefixtures("db",
+                         "products_db", "orders_db",
+                         "regular_user", "member_of_staff")
+class ProductBestsellersViewTest(APITestCase):
+    view = ProductBestsellersView
+    url = reverse(view.name)
+    factory = APIRequestFactory()
+
+    def get_bestsellers(self, data=None, auth_user=None):
+        request = self.factory.get(self.url, data)
+        if auth_user is not None:
+            force_authenticate(request, user=auth_user)
+        response = self.view.as_view()(request)
+        response.render()
+        return response
+
+    def codes(self, rows):
+        return [row['code'] for row in rows]
+
+    def test_anonymous_cant_view_bestsellers(self):
+        response = self.get_bestsellers()
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_regular_user_cant_view_bestsellers(self):
+        response = self.get_bestsellers(auth_user=self.regular_user)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_staff_can_view_bestsellers(self):
+        product = Product.objects.get(code='TP-3')
+        response = self.get_bestsellers({'window': '1d', 'n': 2}, self.member_of_staff)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_200_OK
+        # Response Content
+        assert response.data['window'] == '1d'
+        assert response.data['since'] == response.data['until'] == str(timezone.localdate())
+        # units are tied, ranked by revenue
+        assert self.codes(response.data['by_units']) == ['TP-3', 'TP-2']
+        assert self.codes(response.data['by_revenue']) == ['TP-3', 'TP-2']
+        assert response.data['by_revenue'][0] == {
+            'product_id': product.pk, 'code': 'TP-3', 'name': product.name,
+            'quantity': 2, 'revenue': '6.00', 'order_count': 2,
+        }
+
+    def test_bestsellers_of_a_window(self):
+        order = Order.objects.get(pk=2)
+        order.created = timezone.now() - datetime.timedelta(days=3)
+        order.save()
+        OrderItem.objects.filter(order_id=2, product__code='TP-1').update(quantity=11)
+
+        response = self.get_bestsellers({'window': '1d'}, self.member_of_staff)
+        assert [row['quantity'] for row in response.data['by_units']] == [1, 1, 1]
+
+        response = self.get_bestsellers({'window': '7d'}, self.member_of_staff)
+        assert self.codes(response.data['by_units']) == ['TP-1', 'TP-3', 'TP-2']
+        assert response.data['by_units'][0]['quantity'] == 12
+        assert self.codes(response.data['by_revenue']) == ['TP-1', 'TP-3', 'TP-2']
+
+    def test_bestsellers_are_cached_per_window(self):
+        self.get_bestsellers({'window': '30d', 'n': 1}, self.member_of_staff)
+
+        with self.assertNumQueries(0):
+            response = self.get_bestsellers({'window': '30d', 'n': 3}, self.member_of_staff)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_200_OK
+        # Response Content
+        assert len(response.data['by_units']) == 3
+
+    def test_bestsellers_options_are_validated(self):
+        response = self.get_bestsellers({'window': '2d', 'n': 0}, self.member_of_staff)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        # Response Content
+        assert set(response.data) == {'window', 'n'}
+
+
+@pytest.mark.slow
+@pytest.mark.usefixtures("db", "member_of_staff")
+class ProductBestsellersBenchmark(APITestCase):
+    product_count = 5000
+    days = 30
+
+    def test_bestsellers_benchmark(self):
+        Product.objects.bulk_create([
+            Product(name=f'Product {n}', code=f'BP-{n}', price=Decimal('1.50'), unit='piece')
+            for n in range(self.product_count)
+        ], batch_size=500)
+        today = timezone.localdate()
+        DailyProductSales.objects.bulk_create([
+            DailyProductSales(day=today - datetime.timedelta(days=day), product_id=product_id,
+                              quantity=product_id % 97, revenue=Decimal(product_id % 89), order_count=1)
+            for product_id in Product.objects.values_list('pk', flat=True)
+            for day in range(self.days)
+        ], batch_size=500)
+
+        request = APIRequestFactory().get(reverse(ProductBestsellersView.name), {'window': '30d', 'n': 50})
+        force_authenticate(request, user=self.member_of_staff)
+        with CaptureQueriesContext(connection) as queries:
+            response = ProductBestsellersView.as_view()(request)
+        with self.assertNumQueries(0):
+            cached_response = ProductBestsellersView.as_view()(request)
+
+        assert response.status_code == cached_response.status_code == status.HTTP_200_OK
+        assert len(response.data['by_units']) == 50
+        assert response.data['by_units'][0]['quantity'] == 96 * self.days
+        assert cached_response.data == response.data
+        # one sum of the window's rollup rows, one read of the leaderboard's products
+        assert len(queries) == 2
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {queries[0]["sql"]}')
+            plan = [row[-1] for row in cursor.fetchall()]
+        # the window is a range of the (day, product) index, not a scan of the rollup
+        assert plan[0].startswith('SEARCH orders_dailyproductsales USING INDEX orders_dailyproductsales_day_product')
+        assert plan[0].endswith('(day>? AND day<?)')
@@ -0,0 +1,94 @@
+from django.db import transaction
+from config.exports import IN_CLAUSE_CHUNK_SIZE, chunked
+from .models import Order, OrderStatus
+
+
+def transition_error(current_status, current_status_timestamp, new_status, create_timestamp):
+    """
+    Returns the reason an order with the given current status can not obtain the new status,
+    or `None` if the transition is allowed.
+    """
+    status_names = dict(OrderStatus.STATUS_CHOICES)
+    if current_status == OrderStatus.CLOSED:
+        return "Closed order can not obtain a new status"
+    if current_status == OrderStatus.CANCELLED:
+        return "Cancelled order can not obtain a new status"
+    if not OrderStatus.can_transition(current_status, new_status):
+        return (f"Order status can not change from {status_names.get(current_status, 'none')} "
+                f"to {status_names[new_status]}")
+    if current_status_timestamp is not None and create_timestamp < current_status_timestamp:
+        return "New status can not be older than the current status of the order"
+    return None
+
+
+def bulk_transition(transitions):
+    """
+    Adds new statuses to many orders in one transaction.
+
+    Every transition is a dict with an `order_id`, a `status`, a `create_timestamp` and a
+    `comment`. The current statuses of the orders, and the statuses they already had, are read
+    with a few set-based queries, and the new statuses are inserted in bulk. Transitions for
+    unknown orders, repeated orders, or transitions the current status of an order does not
+    allow are rejected, the remaining transitions are applied.
+
+    Returns a list of per-transition results, in the order of `transitions`.
+    """
+    results = [None] * len(transitions)
+    seen_order_ids = set()
+    for index, change in enumerate(transitions):
+        if change['order_id'] in seen_order_ids:
+            results[index] = _rejected(change, 'Duplicate order_id in request.')
+        seen_order_ids.add(change['order_id'])
+
+    with transaction.atomic():
+        current_statuses = {}
+        existing_statuses = set()
+        new_statuses = {change['status'] for change in transitions}
+        for order_ids in chunked(seen_order_ids, IN_CLAUSE_CHUNK_SIZE):
+            for order_id, *current_status in (Order.objects
+                                              .select_for_update()
+                                              .filter(pk__in=order_ids)
+                                              .values_list('pk', 'current_status', 'current_status_timestamp')):
+                current_statuses[order_id] = current_status
+            # an order can obtain every status only once
+            existing_statuses.update(OrderStatus.objects
+                                     .filter(order_id__in=order_ids, status__in=new_statuses)
+                                     .values_list('order_id', 'status'))
+
+        status_names = dict(OrderStatus.STATUS_CHOICES)
+        created = []
+        for index, change in enumerate(transitions):
+            if results[index] is not None:
+                continue
+            order_id = change['order_id']
+            if order_id not in current_statuses:
+                results[index] = _rejected(change, 'Order does not exist.')
+                continue
+            error = transition_error(*current_statuses[order_id], change['status'], change['create_timestamp'])
+            if error is None and (order_id, change['status']) in existing_statuses:
+                error = f"Order already had the {status_names[change['status']]} status"
+            if error is not None:
+                results[index] = _rejected(change, error)
+                continue
+            created.append((index, OrderStatus(**change)))
+
+        for chunk in chunked(created, IN_CLAUSE_CHUNK_SIZE):
+            OrderStatus.objects.bulk_create([order_status for _, order_status in chunk])
+
+    for index, order_status in created:
+        results[index] = {
+            'order_id': order_status.order_id,
+            'status': order_status.status,
+            'result': 'created',
+            'create_timestamp': order_status.create_timestamp,
+        }
+    return results
+
+
+def _rejected(change, error):
+    return {
+        'order_id': change['order_id'],
+        'status': change['status'],
+        'result': 'rejected',
+        'error': error,
+    }
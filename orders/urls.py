@@ -1,12 +1,19 @@
 from django.urls import path
-from .views import OrderListView, OrderDetailView
-from .views import OrderStatusListCreateView
+from .views import OrderListView, OrderDetailView, OrderExportView, OrderByEmailView
+from .views import OrderStatusListCreateView, OrderStatusBulkCreateView
 from .views import OrderStatusRetrieveUpdateDeleteView
+from .views import DailySalesView, DailyProductSalesView
 
 urlpatterns = [
     path('', OrderListView.as_view(), name=OrderListView.name),
+    path('export/', OrderExportView.as_view(), name=OrderExportView.name),
+    path('by-email/<str:email>/', OrderByEmailView.as_view(), name=OrderByEmailView.name),
     path('<int:pk>/', OrderDetailView.as_view(), name=OrderDetailView.name),
     path('<int:order_id>/status/', OrderStatusListCreateView.as_view(), name=OrderStatusListCreateView.name),
+    path('status/bulk/', OrderStatusBulkCreateView.as_view(), name=OrderStatusBulkCreateView.name),
     path('status/<int:pk>/', OrderStatusRetrieveUpdateDeleteView.as_view(),
          name=OrderStatusRetrieveUpdateDeleteView.name),
+    path('sales/daily/', DailySalesView.as_view(), name=DailySalesView.name),
+    path('sales/daily/products/<int:product_id>/', DailyProductSalesView.as_view(),
+         name=DailyProductSalesView.name),
 ]
@@ -1,13 +1,30 @@
+import datetime
+from collections import defaultdict
+from django.conf import settings
+from django.db import IntegrityError
+from django.core.cache import cache
+from django.db.models import Count, Max, Prefetch, Sum, prefetch_related_objects
+from django.http import Http404
 from django.utils import timezone
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics
+from rest_framework.filters import SearchFilter
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from .models import Order, OrderStatus
-from .serializers import OrderSerializer, OrderDetailSerializer
-from .serializers import OrderStatusSerializer, OrderStatusDisplaySerializer
+from config.conditional import collection_validators, conditional_get, latest, make_etag
+from config.exports import StreamingExportView, chunked
+from .models import Order, OrderItem, OrderStatus, DailyCountrySales, DailyProductSales
+from .serializers import OrderSerializer, OrderDetailSerializer, OrderCheckoutSerializer
+from .serializers import OrderStatusSerializer, OrderStatusDisplaySerializer, OrderStatusChangeSerializer
+from .serializers import SalesReportOptionsSerializer, DailySalesSerializer, DailyProductSalesSerializer
+from .serializers import BestsellersOptionsSerializer, BestsellersSerializer
 from .permissions import HasGroupPermission
 from .filters import OrderFilter
+from .transitions import bulk_transition, transition_error
+from .leaderboard import bestsellers
+from products.cache import catalog
 
 
 required_groups = {
@@ -21,7 +38,11 @@ required_groups = {
     }
 
 
-class OrderListView(generics.ListAPIView):
+class OrderListView(generics.ListCreateAPIView):
+    """
+    Lists the orders, and places a new order (checkout) on POST, with the customer fields
+    and a list of `{product_id, quantity}` items.
+    """
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = (HasGroupPermission,)
@@ -40,9 +61,77 @@ class OrderListView(generics.ListAPIView):
     ordering_fields = (
         'last_name',
         'country',
-        'created'
+        'created',
+        'total_cost'
     )
 
+    @conditional_get
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_serializer_class(self):
+        if self.request.method == 'POST':
+            return OrderCheckoutSerializer
+        return super().get_serializer_class()
+
+    def get_validators(self, request, *args, **kwargs):
+        return collection_validators(self.filter_queryset(self.get_queryset()), 'updated')
+
+
+class OrderExportView(StreamingExportView):
+    """
+    Streams the orders, with their items and current status, as NDJSON or CSV (`?output=csv`).
+    CSV has one line per order item. Accepts the filters and search of the order list.
+    Orders are exported in the order they were created, so a `created_from`/`created_to`
+    date range is read with a range scan of the (created, id) index.
+    """
+    queryset = Order.objects.all()
+    name = 'orders-export'
+
+    permission_classes = (HasGroupPermission, )
+    required_groups = required_groups
+
+    filter_backends = (DjangoFilterBackend, SearchFilter)
+    filter_class = OrderFilter
+    search_fields = OrderListView.search_fields
+
+    export_filename = 'orders'
+    order_fields = ('id', 'first_name', 'last_name', 'email', 'address', 'postal_code', 'city', 'country',
+                    'created', 'updated', 'total_cost')
+    item_fields = ('product_id', 'product_code', 'product_name', 'quantity', 'price')
+    csv_fieldnames = order_fields + ('status',) + item_fields
+
+    def get_records(self, queryset):
+        status_names = dict(OrderStatus.STATUS_CHOICES)
+        orders = (queryset
+                  .order_by('created', 'pk')
+                  .values_list(*self.order_fields, 'current_status'))
+
+        for chunk in chunked(orders.iterator(chunk_size=self.chunk_size), self.chunk_size):
+            # the items of a whole chunk of orders are read with one query
+            items = defaultdict(list)
+            order_items = (OrderItem.objects
+                           .filter(order_id__in=[row[0] for row in chunk])
+                           .order_by('order_id', 'pk')
+                           .values_list('order_id', 'product_id', 'product__code', 'product__name',
+                                        'quantity', 'price'))
+            for order_id, *item in order_items:
+                items[order_id].append(dict(zip(self.item_fields, item)))
+
+            for *row, current_status in chunk:
+                order = dict(zip(self.order_fields, row))
+                order['status'] = status_names.get(current_status)
+                order['items'] = items[order['id']]
+                yield order
+
+    def get_csv_records(self, queryset):
+        for order in self.get_records(queryset):
+            items = order.pop('items')
+            if not items:
+                yield order
+            for item in items:
+                yield {**order, **item}
+
 
 class OrderDetailView(generics.RetrieveAPIView):
     queryset = Order.objects.all()
@@ -52,6 +141,50 @@ class OrderDetailView(generics.RetrieveAPIView):
     permission_classes = (HasGroupPermission, )
     required_groups = required_groups
 
+    # read only when the order details are rendered, not for a 304 response
+    detail_prefetches = (
+        Prefetch('items', queryset=OrderItem.objects.select_related('product')),
+        'statuses',
+    )
+
+    @conditional_get
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        # the order details include its statuses, its items and the current data of the ordered
+        # products, so their versions are read together with the order
+        return super().get_queryset().annotate(
+            latest_status_timestamp=Max('statuses__create_timestamp'),
+            status_count=Count('statuses', distinct=True),
+            latest_status_id=Max('statuses__id'),
+            latest_item_id=Max('items__id'),
+            latest_product_update=Max('items__product__update_timestamp'),
+        )
+
+    def get_object(self):
+        # the order is read once, by get_validators, and reused for the response
+        if getattr(self, '_order', None) is None:
+            self._order = super().get_object()
+        return self._order
+
+    def retrieve(self, request, *args, **kwargs):
+        order = self.get_object()
+        prefetch_related_objects([order], *self.detail_prefetches)
+        serializer = self.get_serializer(order)
+        return Response(serializer.data)
+
+    def get_validators(self, request, *args, **kwargs):
+        try:
+            order = self.get_object()
+        except Http404:
+            return None
+        # item edits change the persisted totals, added or replaced items the latest item id
+        versions = (order.updated, order.latest_status_timestamp, order.status_count, order.latest_status_id,
+                    order.item_count, order.total_cost, order.latest_item_id, order.latest_product_update)
+        return make_etag(*versions), latest(order.updated, order.latest_status_timestamp,
+                                            order.latest_product_update)
+
 
 class OrderStatusListCreateView(APIView):
     name = 'order-status-list'
@@ -72,46 +205,116 @@ class OrderStatusListCreateView(APIView):
             return Response(order_status_serializer.data)
 
     def post(self, request, order_id):
-        try:
-            Order.objects.get(pk=order_id)
-        except Order.DoesNotExist:
+        # the current status of the order is the only read, the transition checks are done on it
+        current = (Order.objects
+                   .filter(pk=order_id)
+                   .values_list('current_status', 'current_status_timestamp')
+                   .first())
+        if current is None:
             return Response(status=status.HTTP_400_BAD_REQUEST)
+        current_status, current_status_timestamp = current
+
+        # if order is closed its status can not be updated
+        if current_status == OrderStatus.CLOSED:
+            return Response("Closed order can not obtain a new status",
+                            status=status.HTTP_403_FORBIDDEN)
+        # if order is cancelled its status can not be updatade
+        if current_status == OrderStatus.CANCELLED:
+            return Response("Cancelled order can not obtain a new status",
+                            status=status.HTTP_403_FORBIDDEN)
+
+        if 'status' not in request.data:
+            return Response("Bad request data", status=status.HTTP_400_BAD_REQUEST)
+
+        if 'comment' not in request.data:
+            comment = ''
         else:
-            # if order is closed its status can not be updated
-            if OrderStatus.objects.filter(order_id=order_id, status=OrderStatus.CLOSED):
-                return Response("Closed order can not obtain a new status",
-                                status=status.HTTP_403_FORBIDDEN)
-            # if order is cancelled its status can not be updatade
-            if OrderStatus.objects.filter(order_id=order_id, status=OrderStatus.CANCELLED):
-                return Response("Cancelled order can not obtain a new status",
-                                status=status.HTTP_403_FORBIDDEN)
-
-            if 'status' not in request.data:
-                return Response("Bad request data", status=status.HTTP_400_BAD_REQUEST)
-
-            if 'comment' not in request.data:
-                comment = ''
-            else:
-                comment = request.data["comment"]
+            comment = request.data["comment"]
 
-            if 'create_timestamp' not in request.data:
-                create_timestamp = timezone.now()
-            else:
-                create_timestamp = request.data["create_timestamp"]
-
-            data = {
-                "order_id": order_id,
-                "status": request.data["status"],
-                "create_timestamp": create_timestamp,
-                "comment": comment,
-            }
-
-            order_status_serializer = OrderStatusSerializer(data=data)
-            if order_status_serializer.is_valid():
-                order_status_serializer.save()
-                return Response(order_status_serializer.data, status=status.HTTP_201_CREATED)
+        if 'create_timestamp' not in request.data:
+            create_timestamp = timezone.now()
+        else:
+            create_timestamp = request.data["create_timestamp"]
+
+        data = {
+            "order_id": order_id,
+            "status": request.data["status"],
+            "create_timestamp": create_timestamp,
+            "comment": comment,
+        }
+
+        order_status_serializer = OrderStatusSerializer(data=data)
+        if not order_status_serializer.is_valid():
+            return Response(order_status_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        validated_data = order_status_serializer.validated_data
+        status_names = dict(OrderStatus.STATUS_CHOICES)
+        if validated_data['status'] not in status_names:
+            return Response({'status': [f'"{validated_data["status"]}" is not a valid choice.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # closed and cancelled orders are rejected above
+        error = transition_error(current_status, current_status_timestamp,
+                                 validated_data['status'], validated_data['create_timestamp'])
+        if error is not None:
+            return Response(error, status=status.HTTP_409_CONFLICT)
+
+        try:
+            order_status = OrderStatus.objects.create_transition(
+                current_status=current_status, current_status_timestamp=current_status_timestamp,
+                **validated_data
+            )
+        except IntegrityError:
+            order_status = None
+        if order_status is None:
+            return Response("Order status has been changed by another request",
+                            status=status.HTTP_409_CONFLICT)
+        return Response(OrderStatusSerializer(order_status).data, status=status.HTTP_201_CREATED)
+
+
+class OrderStatusBulkCreateView(APIView):
+    """
+    Adds new statuses to a list of orders, each one a `status` for an `order_id` with an optional
+    `comment` and `create_timestamp`, in a single transaction, and reports the result for every order.
+    """
+    name = 'order-status-bulk'
+    permission_classes = (HasGroupPermission, )
+    required_groups = required_groups
+
+    def post(self, request):
+        if not isinstance(request.data, list):
+            return Response("Bad request data", status=status.HTTP_400_BAD_REQUEST)
+        if len(request.data) > settings.MAX_BULK_STATUS_CHANGES:
+            return Response(f"At most {settings.MAX_BULK_STATUS_CHANGES} status changes can be sent at once",
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        change_serializer = OrderStatusChangeSerializer()
+        now = timezone.now()
+        results = [None] * len(request.data)
+        changes = []
+        change_indexes = []
+        for index, item in enumerate(request.data):
+            try:
+                change = change_serializer.run_validation(item)
+            except ValidationError as e:
+                results[index] = {
+                    'order_id': item.get('order_id') if isinstance(item, dict) else None,
+                    'status': item.get('status') if isinstance(item, dict) else None,
+                    'result': 'rejected',
+                    'error': e.detail,
+                }
             else:
-                return Response(order_status_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+                change.setdefault('create_timestamp', now)
+                changes.append(change)
+                change_indexes.append(index)
+
+        for index, result in zip(change_indexes, bulk_transition(changes)):
+            results[index] = result
+
+        if any(result['result'] == 'rejected' for result in results):
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+        return Response(results, status=response_status)
 
 
 class OrderStatusRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
@@ -122,3 +325,121 @@ class OrderStatusRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView)
     permission_classes = (HasGroupPermission, )
     required_groups = required_groups
 
+
+
+class DailySalesView(generics.GenericAPIView):
+    """
+    Returns the number of orders, order items and the revenue of every day between `?since=`
+    and `?until=` (the last year by default), of the orders of one `?country=` or of all
+    countries. Cancelled orders are not counted. Figures are read from the daily country
+    sales rollup, days without orders are listed with zeros.
+    """
+    name = 'daily-sales'
+
+    permission_classes = (HasGroupPermission, )
+    required_groups = required_groups
+
+    value_fields = DailyCountrySales.value_fields
+    serializer_class = DailySalesSerializer
+
+    def get(self, request, *args, **kwargs):
+        options_serializer = SalesReportOptionsSerializer(data=request.query_params)
+        if not options_serializer.is_valid():
+            return Response(options_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        options = options_serializer.validated_data
+
+        rows = (self.get_rollup_queryset(options)
+                .filter(day__gte=options['since'], day__lte=options['until'])
+                .values('day')
+                .annotate(**{field: Sum(field) for field in self.value_fields})
+                .order_by('day'))
+        figures = {row['day']: row for row in rows}
+        days = []
+        day = options['since']
+        while day <= options['until']:
+            days.append(figures.get(day) or {'day': day, **{field: 0 for field in self.value_fields}})
+            day += datetime.timedelta(days=1)
+
+        return Response({
+            'since': options['since'],
+            'until': options['until'],
+            'days': self.get_serializer(days, many=True).data,
+        })
+
+    def get_rollup_queryset(self, options):
+        queryset = DailyCountrySales.objects.all()
+        if 'country' in options:
+            queryset = queryset.filter(country=options['country'])
+        return queryset
+
+
+class DailyProductSalesView(DailySalesView):
+    """
+    Returns the units sold, the revenue and the number of orders of a product for every day
+    between `?since=` and `?until=` (the last year by default). Cancelled orders are not
+    counted. Figures are read from the daily product sales rollup.
+    """
+    name = 'daily-product-sales'
+
+    value_fields = DailyProductSales.value_fields
+    serializer_class = DailyProductSalesSerializer
+
+    def get_rollup_queryset(self, options):
+        return DailyProductSales.objects.filter(product_id=self.kwargs['product_id'])
+
+
+class ProductBestsellersView(generics.GenericAPIView):
+    """
+    Returns the top `?n=` products by units sold and by revenue of the last `?window=`
+    (`1d`, `7d` or `30d`, today included), not counting cancelled orders. Leaderboards are
+    computed from the daily product sales rollup and cached per window for a short time.
+    """
+    name = 'products-bestsellers'
+
+    permission_classes = (HasGroupPermission, )
+    required_groups = required_groups
+
+    cache_key_prefix = 'products:bestsellers:'
+
+    def get(self, request):
+        options_serializer = BestsellersOptionsSerializer(data=request.query_params)
+        if not options_serializer.is_valid():
+            return Response(options_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        window, n = options_serializer.validated_data['window'], options_serializer.validated_data['n']
+
+        today = timezone.localdate()
+        cache_key = f'{self.cache_key_prefix}{window}:{today}'
+        leaderboard = cache.get(cache_key)
+        if leaderboard is None:
+            # the longest leaderboard serves every `n`
+            leaderboard = bestsellers(window, settings.MAX_BESTSELLERS, today=today)
+            rows = leaderboard['by_units'] + leaderboard['by_revenue']
+            products = catalog.get_many(row['product_id'] for row in rows)
+            for row in rows:
+                product = products.get(row['product_id'])
+                row['code'], row['name'] = (product.code, product.name) if product else ('', '')
+            leaderboard = BestsellersSerializer(leaderboard).data
+            cache.set(cache_key, leaderboard, settings.BESTSELLERS_CACHE_TIMEOUT)
+
+        return Response({
+            **leaderboard,
+            'by_units': leaderboard['by_units'][:n],
+            'by_revenue': leaderboard['by_revenue'][:n],
+        })
+
+
+class OrderByEmailView(generics.ListAPIView):
+    """
+    Lists the orders of a customer, by their email address, whatever its case.
+    """
+    queryset = Order.objects.all()
+    serializer_class = OrderSerializer
+    name = 'orders-by-email'
+
+    permission_classes = (HasGroupPermission, )
+    required_groups = required_groups
+
+    filter_backends = ()
+
+    def get_queryset(self):
+        return super().get_queryset().by_email(self.kwargs['email'])
@@ -27,7 +27,7 @@ class ProductStockInline(admin.TabularInline):
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    fields = ('id', 'name', 'code', 'price')
+    fields = ('id', 'name', 'code', 'price', 'reorder_threshold')
     readonly_fields = ('id',)
     list_display = ('id', 'name', 'code', 'price', 'update_timestamp', 'stock_size', 'stock_update_time')
 
@@ -35,8 +35,8 @@ class ProductAdmin(admin.ModelAdmin):
 
     @admin.display(description='Stock Size')
     def stock_size(self, obj):
-        return obj.available_stock.stock_size
+        return obj.current_stock
 
     @admin.display(description='Stock Update Time')
     def stock_update_time(self, obj):
-        return obj.available_stock.update_timestamp
+        return obj.current_stock_timestamp
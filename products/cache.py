@@ -0,0 +1,130 @@
+import threading
+from collections import OrderedDict
+from uuid import uuid4
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from .models import Product
+
+
+VERSION_KEY_PREFIX = 'products:catalog:version:'
+
+
+class CatalogCache:
+    """
+    Process-local LRU cache of product rows, keyed by product id and code.
+
+    Every cached product carries the version token its row was read under. The tokens live in
+    the shared Django cache, and are replaced whenever a product or its stock changes, so a
+    lookup (one `get_many` call for any number of products) tells every process which of its
+    entries are stale.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._product_ids_by_code = {}
+        self._lock = threading.Lock()
+
+    def get(self, product_id):
+        """
+        Returns the product with the given id, or `None` if it does not exist.
+        """
+        return self.get_many([product_id]).get(int(product_id))
+
+    def get_by_code(self, code):
+        """
+        Returns the product with the given code, or `None` if it does not exist.
+        """
+        with self._lock:
+            product_id = self._product_ids_by_code.get(code)
+        if product_id is not None:
+            product = self.get(product_id)
+            if product is not None and product.code == code:
+                return product
+        product_id = Product.objects.filter(code=code).values_list('pk', flat=True).first()
+        if product_id is None:
+            return None
+        return self.get(product_id)
+
+    def get_many(self, product_ids):
+        """
+        Returns a dict of the products with the given ids, leaving out products that do not exist.
+        Products which are not cached, or whose cached version is stale, are read in one query.
+        """
+        product_ids = {int(product_id) for product_id in product_ids}
+        versions = self._current_versions(product_ids)
+
+        products = {}
+        missing_ids = []
+        with self._lock:
+            for product_id in product_ids:
+                entry = self._entries.get(product_id)
+                if entry is not None and entry[0] == versions[product_id]:
+                    self._entries.move_to_end(product_id)
+                    products[product_id] = self._build_product(entry[1])
+                else:
+                    missing_ids.append(product_id)
+
+        if missing_ids:
+            field_names = [field.attname for field in Product._meta.concrete_fields]
+            rows = Product.objects.filter(pk__in=missing_ids).values_list(*field_names)
+            with self._lock:
+                for row in rows:
+                    values = dict(zip(field_names, row))
+                    self._store(versions[values['id']], values)
+                    products[values['id']] = self._build_product(values)
+        return products
+
+    def invalidate(self, product_ids):
+        """
+        Marks the cached entries of the given products as stale in every process.
+        """
+        product_ids = list(product_ids)
+        # replaced right away, and again after commit, so that no process keeps
+        # a copy read before the change was committed
+        self._replace_versions(product_ids)
+        transaction.on_commit(lambda: self._replace_versions(product_ids))
+        with self._lock:
+            for product_id in product_ids:
+                self._entries.pop(product_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._product_ids_by_code.clear()
+
+    def _replace_versions(self, product_ids):
+        cache.set_many({self._version_key(product_id): uuid4().hex for product_id in product_ids}, timeout=None)
+
+    def _current_versions(self, product_ids):
+        keys = {self._version_key(product_id): product_id for product_id in product_ids}
+        versions = {keys[key]: version for key, version in cache.get_many(list(keys)).items()}
+        for product_id in product_ids:
+            if product_id not in versions:
+                # unknown to the shared cache, so any cached entry is stale
+                version = uuid4().hex
+                if not cache.add(self._version_key(product_id), version, timeout=None):
+                    version = cache.get(self._version_key(product_id))
+                versions[product_id] = version
+        return versions
+
+    def _store(self, version, values):
+        self._entries[values['id']] = (version, values)
+        self._entries.move_to_end(values['id'])
+        self._product_ids_by_code[values['code']] = values['id']
+        while len(self._entries) > self.max_size:
+            _, (_, evicted_values) = self._entries.popitem(last=False)
+            if self._product_ids_by_code.get(evicted_values['code']) == evicted_values['id']:
+                del self._product_ids_by_code[evicted_values['code']]
+
+    @staticmethod
+    def _build_product(values):
+        return Product.from_db('default', list(values), list(values.values()))
+
+    @staticmethod
+    def _version_key(product_id):
+        return f'{VERSION_KEY_PREFIX}{product_id}'
+
+
+catalog = CatalogCache(settings.CATALOG_CACHE_SIZE)
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_catalog_cache_backend(app_configs, **kwargs):
+    # the version tokens of the catalog cache have to be seen by every worker process
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Warning(
+            'The default cache backend is local to each process, so product changes made by one '
+            'worker process are not seen by the product catalog cache of the others.',
+            hint='Configure a shared cache backend (e.g. memcached or redis) in CACHES, '
+                 'or serve the API from a single process.',
+            id='products.W001',
+        )]
+    return []
@@ -0,0 +1,89 @@
+from decimal import Decimal
+from django.db import connections
+
+
+HISTOGRAM_MODES = ('fixed', 'quantile')
+
+PRICE_PLACES = Decimal('0.01')
+
+FIXED_BUCKETS_SQL = """
+    SELECT bucket, COUNT(*), MIN(price), MAX(price), MIN(lowest), MAX(highest)
+    FROM (
+        SELECT price, lowest, highest,
+               CASE WHEN highest = lowest THEN 0
+                    WHEN price = highest THEN %s - 1
+                    ELSE FLOOR((price - lowest) * %s / (highest - lowest))
+               END AS bucket
+        FROM (
+            SELECT price, MIN(price) OVER () AS lowest, MAX(price) OVER () AS highest
+            FROM ({products}) AS filtered_products
+        ) AS bounded_products
+    ) AS bucketed_products
+    GROUP BY bucket
+    ORDER BY bucket
+"""
+
+QUANTILE_BUCKETS_SQL = """
+    SELECT bucket, COUNT(*), MIN(price), MAX(price)
+    FROM (
+        SELECT price, NTILE(%s) OVER (ORDER BY price) - 1 AS bucket
+        FROM ({products}) AS filtered_products
+    ) AS bucketed_products
+    GROUP BY bucket
+    ORDER BY bucket
+"""
+
+
+def price_histogram(queryset, buckets=10, mode='fixed'):
+    """
+    Returns the count, min and max price of the products of `queryset`, together with the
+    price histogram of the products, computed by the database with a single aggregate query.
+
+    In `fixed` mode the price range is split into `buckets` buckets of the same width, empty
+    buckets included. In `quantile` mode the products are split into up to `buckets` buckets
+    of about the same number of products, each bucket spanning the prices of its products.
+    """
+    products_sql, products_params = queryset.order_by().values('price').query.sql_with_params()
+    if mode == 'quantile':
+        sql = QUANTILE_BUCKETS_SQL.format(products=products_sql)
+        params = (buckets, *products_params)
+    else:
+        sql = FIXED_BUCKETS_SQL.format(products=products_sql)
+        params = (buckets, buckets, *products_params)
+
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    histogram = {
+        'count': sum(row[1] for row in rows),
+        'min': _price(rows[0][2]) if rows else None,
+        'max': _price(rows[-1][3]) if rows else None,
+        'mode': mode,
+        'buckets': [],
+    }
+    if not rows:
+        return histogram
+
+    if mode == 'quantile':
+        histogram['buckets'] = [
+            {'lower': _price(lowest), 'upper': _price(highest), 'count': count}
+            for _, count, lowest, highest in rows
+        ]
+        return histogram
+
+    counts = {int(row[0]): row[1] for row in rows}
+    lowest, highest = histogram['min'], histogram['max']
+    width = (highest - lowest) / buckets
+    for bucket in range(buckets if highest > lowest else 1):
+        histogram['buckets'].append({
+            'lower': (lowest + width * bucket).quantize(PRICE_PLACES),
+            'upper': (lowest + width * (bucket + 1)).quantize(PRICE_PLACES) if highest > lowest else highest,
+            'count': counts.get(bucket, 0),
+        })
+    return histogram
+
+
+def _price(value):
+    # SQLite returns decimal columns computed by aggregates as floats
+    return Decimal(str(value)).quantize(PRICE_PLACES)
@@ -0,0 +1,51 @@
+from datetime import datetime, time, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from config.exports import IN_CLAUSE_CHUNK_SIZE
+from products.models import Product
+from products.stock import SNAPSHOT_PERIODS, compact_product_stock
+
+
+class Command(BaseCommand):
+    help = ('Archives ProductStock entries older than a given date, keeping one snapshot entry '
+            'per product and period in the stock ledger.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', type=str,
+                            help='Only entries older than this date (YYYY-MM-DD) are compacted. '
+                                 'Defaults to 90 days ago.')
+        parser.add_argument('--period', choices=sorted(SNAPSHOT_PERIODS), default='day',
+                            help='Period covered by one snapshot entry.')
+        parser.add_argument('--batch-size', type=int, default=IN_CLAUSE_CHUNK_SIZE,
+                            help='Number of ledger entries processed per transaction.')
+        parser.add_argument('--start-after', type=int, default=0,
+                            help='Resume compaction after the product with this id.')
+
+    def handle(self, *args, **options):
+        if options['before']:
+            before_date = parse_date(options['before'])
+            if before_date is None:
+                raise CommandError(f"Invalid date: {options['before']}")
+        else:
+            before_date = timezone.localdate() - timedelta(days=90)
+        before = timezone.make_aware(datetime.combine(before_date, time.min))
+
+        product_ids = Product.objects.order_by('pk').values_list('pk', flat=True)
+        last_id = options['start_after']
+        archived = 0
+        while True:
+            batch = list(product_ids.filter(pk__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            for product_id in batch:
+                product_archived = compact_product_stock(product_id, before, options['period'],
+                                                         options['batch_size'])
+                archived += product_archived
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'Product {product_id}: {product_archived} stock entries archived.')
+            last_id = batch[-1]
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{archived} stock entries older than {before_date} archived.'
+        ))
@@ -0,0 +1,130 @@
+import csv
+import json
+import sys
+import time
+from itertools import islice
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from config.exports import IN_CLAUSE_CHUNK_SIZE
+from products.cache import catalog
+from products.models import Product, ProductStock
+from products.serializers import ProductImportSerializer
+from products.stock import sync_current_stock
+
+
+IMPORT_FIELDS = ('name', 'code', 'price', 'unit')
+
+
+class Command(BaseCommand):
+    help = ('Imports products from a CSV or JSON Lines file, creating new products and updating '
+            'the existing ones with the same code.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSON Lines file, or '-' to read from standard input.")
+        parser.add_argument('--format', choices=('csv', 'jsonl'),
+                            help='Input format. Defaults to the file extension.')
+        parser.add_argument('--chunk-size', type=int, default=IN_CLAUSE_CHUNK_SIZE,
+                            help='Number of rows validated and written per transaction.')
+
+    def handle(self, *args, **options):
+        input_format = options['format']
+        if input_format is None:
+            input_format = 'csv' if options['path'].lower().endswith('.csv') else 'jsonl'
+
+        if options['path'] == '-':
+            self.import_products(sys.stdin, input_format, options['chunk_size'])
+        else:
+            try:
+                with open(options['path'], newline='', encoding='utf-8') as input_file:
+                    self.import_products(input_file, input_format, options['chunk_size'])
+            except OSError as e:
+                raise CommandError(f"Can not read {options['path']}: {e}")
+
+    def import_products(self, input_file, input_format, chunk_size):
+        self.counts = {'created': 0, 'updated': 0, 'unchanged': 0, 'duplicate': 0, 'invalid': 0}
+        started = time.perf_counter()
+
+        rows = self.read_rows(input_file, input_format)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+
+        elapsed = time.perf_counter() - started
+        total = sum(self.counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} rows processed in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.0f} rows/sec): "
+            f"{self.counts['created']} created, {self.counts['updated']} updated, "
+            f"{self.counts['unchanged']} unchanged, {self.counts['duplicate']} duplicate, "
+            f"{self.counts['invalid']} invalid."
+        ))
+
+    def read_rows(self, input_file, input_format):
+        """
+        Yields (line number, row) pairs, one row at a time.
+        """
+        if input_format == 'csv':
+            reader = csv.DictReader(input_file)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(input_file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except ValueError as e:
+                    yield line_number, e
+
+    def import_chunk(self, chunk):
+        row_serializer = ProductImportSerializer()
+        products = {}
+        for line_number, row in chunk:
+            try:
+                if not isinstance(row, dict):
+                    raise ValidationError(f'Invalid row: {row}')
+                data = row_serializer.run_validation({field: row.get(field) for field in IMPORT_FIELDS})
+            except ValidationError as e:
+                self.counts['invalid'] += 1
+                self.stderr.write(f'Line {line_number}: {e.detail}')
+                continue
+            if data['code'] in products:
+                # a later row with the same code replaces the earlier one
+                self.counts['duplicate'] += 1
+            products[data['code']] = data
+
+        with transaction.atomic():
+            existing_products = {
+                product.code: product
+                for product in Product.objects.filter(code__in=list(products)).only('pk', *IMPORT_FIELDS)
+            }
+
+            new_products = []
+            changed_products = []
+            for code, data in products.items():
+                product = existing_products.get(code)
+                if product is None:
+                    new_products.append(Product(**data))
+                elif any(getattr(product, field) != data[field] for field in IMPORT_FIELDS):
+                    for field in IMPORT_FIELDS:
+                        setattr(product, field, data[field])
+                    product.update_timestamp = timezone.now()
+                    changed_products.append(product)
+                else:
+                    self.counts['unchanged'] += 1
+
+            Product.objects.bulk_create(new_products)
+            Product.objects.bulk_update(changed_products, IMPORT_FIELDS + ('update_timestamp',))
+
+            # initial stock entries of the new products
+            new_product_ids = list(Product.objects.filter(code__in=[product.code for product in new_products])
+                                   .values_list('pk', flat=True))
+            ProductStock.objects.bulk_create([ProductStock(product_id=product_id) for product_id in new_product_ids])
+            sync_current_stock(new_product_ids)
+            catalog.invalidate([product.pk for product in changed_products])
+
+        self.counts['created'] += len(new_products)
+        self.counts['updated'] += len(changed_products)
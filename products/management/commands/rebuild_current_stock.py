@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+from products.models import Product
+from products.stock import sync_current_stock
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the current stock columns of products from the ProductStock ledger.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of products updated per transaction.')
+        parser.add_argument('--check', action='store_true',
+                            help='Only report products whose current stock differs from the ledger.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        product_ids = Product.objects.order_by('pk').values_list('pk', flat=True)
+        last_id = 0
+        updated = 0
+        while True:
+            batch = list(product_ids.filter(pk__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            if options['check']:
+                updated += self.report_stale_products(batch)
+            else:
+                with transaction.atomic():
+                    updated += sync_current_stock(batch)
+            last_id = batch[-1]
+
+        if options['check']:
+            self.stdout.write(self.style.SUCCESS(f'{updated} product(s) with stale current stock.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Current stock rebuilt for {updated} product(s).'))
+
+    def report_stale_products(self, product_ids):
+        stale_products = (Product.objects
+                          .filter(pk__in=product_ids)
+                          .with_current_stock()
+                          .filter(~Q(current_stock=F('stock_size')) |
+                                  ~Q(current_stock_timestamp=F('stock_update_timestamp')))
+                          .values_list('pk', 'current_stock', 'stock_size'))
+        count = 0
+        for product_id, current_stock, stock_size in stale_products:
+            self.stdout.write(f'Product {product_id}: current stock {current_stock}, ledger stock {stock_size}.')
+            count += 1
+        return count
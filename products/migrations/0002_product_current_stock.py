@@ -0,0 +1,42 @@
+# Generated by Django 3.2.4 on 2026-10-18 10:13
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def copy_latest_stock(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductStock = apps.get_model('products', 'ProductStock')
+    latest_stock = ProductStock.objects.filter(product=OuterRef('pk')).order_by('-update_timestamp')
+    Product.objects.update(
+        current_stock=Coalesce(Subquery(latest_stock.values('stock_size')[:1]), Value(0),
+                               output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+        current_stock_timestamp=Subquery(latest_stock.values('update_timestamp')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='current_stock',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12, verbose_name='Stock Size'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='current_stock_timestamp',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Stock Update Time'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='update_timestamp',
+            field=models.DateTimeField(auto_now=True, verbose_name='Product Update Time'),
+        ),
+        migrations.RunPython(copy_latest_stock, migrations.RunPython.noop),
+    ]
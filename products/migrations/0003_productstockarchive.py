@@ -0,0 +1,31 @@
+# Generated by Django 3.2.4 on 2026-10-18 10:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_product_current_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductStockArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('stock_size', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('update_timestamp', models.DateTimeField()),
+                ('archive_timestamp', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_stock', to='products.product')),
+            ],
+            options={
+                'ordering': ('-update_timestamp',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='productstockarchive',
+            index=models.Index(fields=['product', 'update_timestamp'], name='products_archive_product_idx'),
+        ),
+    ]
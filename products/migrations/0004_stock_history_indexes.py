@@ -0,0 +1,25 @@
+# Generated by Django 3.2.4 on 2026-10-18 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_productstockarchive'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='productstockarchive',
+            name='products_archive_product_idx',
+        ),
+        migrations.AddIndex(
+            model_name='productstock',
+            index=models.Index(fields=['product', 'update_timestamp', 'id'], name='products_stock_history_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productstockarchive',
+            index=models.Index(fields=['product', 'update_timestamp', 'id'], name='products_archive_history_idx'),
+        ),
+    ]
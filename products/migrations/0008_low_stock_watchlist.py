@@ -0,0 +1,31 @@
+# Generated by Django 3.2.4 on 2026-10-18 10:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import products.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LowStockProduct',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='low_stock', serialize=False, to='products.product')),
+                ('since', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ('product',),
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reorder_threshold',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12, validators=[products.models.validate_non_negative]),
+        ),
+    ]
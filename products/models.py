@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 
@@ -11,6 +13,24 @@ def validate_non_negative(value):
         )
 
 
+class ProductQuerySet(models.QuerySet):
+    def with_current_stock(self):
+        """
+        Annotates every product with the size (`stock_size`) and the update time
+        (`stock_update_timestamp`) of its latest ProductStock entry. Both are correlated
+        subqueries, so the stock of a whole page of products is read in a single query.
+        """
+        return self.annotate(**latest_stock_expressions())
+
+
+def latest_stock_expressions():
+    latest_stock = ProductStock.objects.filter(product=OuterRef('pk')).order_by('-update_timestamp')
+    return {
+        'stock_size': Subquery(latest_stock.values('stock_size')[:1]),
+        'stock_update_timestamp': Subquery(latest_stock.values('update_timestamp')[:1]),
+    }
+
+
 class Product(models.Model):
     name = models.CharField(max_length=128)
     code = models.CharField(max_length=10, unique=True)
@@ -18,25 +38,63 @@ class Product(models.Model):
     unit = models.CharField(max_length=12)
     create_timestamp = models.DateTimeField(auto_now_add=True)
     update_timestamp = models.DateTimeField(auto_now=True, verbose_name='Product Update Time')
+    # Denormalized copy of the latest ProductStock entry, maintained by ProductStock.save
+    current_stock = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False,
+                                        verbose_name='Stock Size')
+    current_stock_timestamp = models.DateTimeField(null=True, blank=True, editable=False,
+                                                   verbose_name='Stock Update Time')
+    # products with a current stock below the threshold are listed in the LowStockProduct watchlist
+    reorder_threshold = models.DecimalField(max_digits=12, decimal_places=2, default=0,
+                                            validators=[validate_non_negative])
+
+    STOCK_FIELDS = ('current_stock', 'current_stock_timestamp')
+
+    objects = ProductQuerySet.as_manager()
 
     class Meta:
         ordering = ('code',)
+        indexes = [
+            # keyset pages of the product list are ordered by one of these fields and the id
+            models.Index(fields=['name', 'id'], name='products_name_id_idx'),
+            models.Index(fields=['price', 'id'], name='products_price_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.code}: {self.name}, {self.price} USD"
 
     def save(self, *args, **kwargs):
-        isNewInstance = self.pk is None
+        isNewInstance = self._state.adding
+        if not isNewInstance and kwargs.get('update_fields') is None:
+            # stock columns are owned by the stock ledger, never overwrite them with stale values
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in self.STOCK_FIELDS]
         super().save(*args, **kwargs)
         if isNewInstance:
             ProductStock.objects.create(product=self)
+        else:
+            LowStockProduct.objects.sync([self.pk])
 
     @property
     def available_stock(self):
         return self.stock.latest('update_timestamp')
 
     def add_stock(self, stock_size):
-        ProductStock.objects.create(product=self, stock_size=stock_size)
+        return ProductStock.objects.create(product=self, stock_size=stock_size)
+
+
+class ProductStockQuerySet(models.QuerySet):
+    """
+    Keeps the current stock of the products up to date on bulk deletes of stock entries.
+    """
+
+    def delete(self):
+        from .stock import sync_current_stock
+
+        with transaction.atomic(using=self.db):
+            product_ids = set(self.values_list('product_id', flat=True))
+            deleted = super().delete()
+            sync_current_stock(product_ids)
+        return deleted
 
 
 class ProductStock(models.Model):
@@ -44,11 +102,95 @@ class ProductStock(models.Model):
     stock_size = models.DecimalField(max_digits=12, decimal_places=2, default=0, validators=[validate_non_negative])
     update_timestamp = models.DateTimeField(auto_now=True)
 
+    objects = ProductStockQuerySet.as_manager()
+
     class Meta:
         ordering = ('-update_timestamp',)
         unique_together = ['product', 'update_timestamp']
+        indexes = [
+            models.Index(fields=['product', 'update_timestamp', 'id'], name='products_stock_history_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.stock_size} {self.product.unit}(s)"
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Product.objects.filter(pk=self.product_id).update(
+                current_stock=self.stock_size,
+                current_stock_timestamp=self.update_timestamp
+            )
+            LowStockProduct.objects.sync([self.product_id])
+        if ProductStock.product.is_cached(self):
+            self.product.current_stock = self._meta.get_field('stock_size').to_python(self.stock_size)
+            self.product.current_stock_timestamp = self.update_timestamp
+
+    def delete(self, *args, **kwargs):
+        from .stock import sync_current_stock
+
+        with transaction.atomic():
+            deleted = super().delete(*args, **kwargs)
+            # the previous entry, if any, is the current stock again
+            sync_current_stock([self.product_id])
+        if ProductStock.product.is_cached(self):
+            self.product.refresh_from_db(fields=Product.STOCK_FIELDS)
+        return deleted
+
+
+class ProductStockArchive(models.Model):
+    """
+    ProductStock entries superseded by a later snapshot entry, moved out of the live ledger
+    by the compact_stock_ledger command. Entries keep the id of the original ProductStock entry.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    product = models.ForeignKey(Product, related_name='archived_stock', on_delete=models.CASCADE)
+    stock_size = models.DecimalField(max_digits=12, decimal_places=2)
+    update_timestamp = models.DateTimeField()
+    archive_timestamp = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ('-update_timestamp',)
+        indexes = [
+            models.Index(fields=['product', 'update_timestamp', 'id'], name='products_archive_history_idx'),
+        ]
 
     def __str__(self):
         return f"{self.stock_size} {self.product.unit}(s)"
 
 
+class LowStockProductManager(models.Manager):
+    def sync(self, product_ids):
+        """
+        Adds the given products to the watchlist if their current stock is below their reorder
+        threshold, and removes them from it otherwise, with a few set-based statements.
+        Keep `product_ids` short enough for an `IN (...)` list.
+        """
+        product_ids = list(product_ids)
+        self.filter(product_id__in=product_ids).exclude(
+            product__current_stock__lt=F('product__reorder_threshold')
+        ).delete()
+        low_stock_ids = (Product.objects
+                         .filter(pk__in=product_ids, current_stock__lt=F('reorder_threshold'))
+                         .values_list('pk', flat=True))
+        # products already on the watchlist keep the time they were added
+        self.bulk_create([self.model(product_id=product_id) for product_id in low_stock_ids],
+                         ignore_conflicts=True)
+
+
+class LowStockProduct(models.Model):
+    """
+    Watchlist of the products with a current stock below their reorder threshold, kept up to
+    date whenever the stock or the threshold of a product changes.
+    """
+    product = models.OneToOneField(Product, primary_key=True, related_name='low_stock',
+                                   on_delete=models.CASCADE)
+    since = models.DateTimeField(default=timezone.now)
+
+    objects = LowStockProductManager()
+
+    class Meta:
+        ordering = ('product',)
+
+    def __str__(self):
+        return f"{self.product.code}: {self.product.current_stock} {self.product.unit}(s)"
@@ -0,0 +1,128 @@
+import re
+from django.db import connections
+from rest_framework.filters import SearchFilter
+from rest_framework.settings import api_settings
+
+
+SEARCH_TABLE = 'products_product_fts'
+
+SEARCH_INDEX_SQL = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        name, code,
+        content='products_product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON products_product BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, name, code) VALUES (new.id, new.name, new.code);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON products_product BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, code) VALUES ('delete', old.id, old.name, old.code);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update AFTER UPDATE OF name, code ON products_product BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, code) VALUES ('delete', old.id, old.name, old.code);
+        INSERT INTO {SEARCH_TABLE}(rowid, name, code) VALUES (new.id, new.name, new.code);
+    END
+    """,
+)
+
+SEARCH_TRIGGERS = (f'{SEARCH_TABLE}_insert', f'{SEARCH_TABLE}_delete', f'{SEARCH_TABLE}_update')
+
+_search_index_available = {}
+
+
+def fts5_supported(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if cursor.fetchone()[0]:
+            return True
+        # FTS5 may also be built in without the compile option being reported
+        cursor.execute("SELECT 1 FROM pragma_module_list WHERE name = 'fts5'")
+        return cursor.fetchone() is not None
+
+
+def install_search_index(connection):
+    """
+    Creates the full-text index of product names and codes, and the triggers that keep it
+    in sync with the product table, unless they exist already.
+
+    SQLite drops the triggers whenever a migration rebuilds the product table, so this is
+    run after every migration; the index is rebuilt from the product table whenever a
+    trigger had to be created. Does nothing on databases without FTS5.
+    """
+    _search_index_available.pop(connection.alias, None)
+    if not fts5_supported(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'products_product'"
+        )
+        existing_triggers = {row[0] for row in cursor.fetchall()}
+        for statement in SEARCH_INDEX_SQL:
+            cursor.execute(statement)
+        if not existing_triggers.issuperset(SEARCH_TRIGGERS):
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def uninstall_search_index(connection):
+    _search_index_available.pop(connection.alias, None)
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for trigger in SEARCH_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+def search_index_available(alias):
+    if alias not in _search_index_available:
+        connection = connections[alias]
+        _search_index_available[alias] = (
+            connection.vendor == 'sqlite' and SEARCH_TABLE in connection.introspection.table_names()
+        )
+    return _search_index_available[alias]
+
+
+def match_expression(search_terms):
+    """
+    Builds an FTS5 query matching the products which contain a word starting with
+    every word of the search terms.
+    """
+    words = [word for term in search_terms for word in re.findall(r'\w+', term)]
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+class ProductSearchFilter(SearchFilter):
+    """
+    Serves `?search=` from the full-text index of product names and codes, with the best
+    matches first unless another ordering is requested. Falls back to the regular
+    `SearchFilter` on databases without the index.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+
+        match = match_expression(search_terms)
+        if not match or not search_index_available(queryset.db):
+            return super().filter_queryset(request, queryset, view)
+
+        queryset = queryset.extra(
+            select={'search_rank': f'{SEARCH_TABLE}.rank'},
+            tables=[SEARCH_TABLE],
+            where=[f'{SEARCH_TABLE}.rowid = products_product.id', f'{SEARCH_TABLE} MATCH %s'],
+            params=[match],
+        )
+        if api_settings.ORDERING_PARAM not in request.query_params:
+            queryset = queryset.order_by('search_rank', 'pk')
+        return queryset
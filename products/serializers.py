@@ -1,5 +1,8 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import Product, ProductStock
+from .models import Product, ProductStock, LowStockProduct
+from . import stock
+from .facets import HISTOGRAM_MODES
 
 
 def validate_stock_size(stock_size):
@@ -7,11 +10,6 @@ def validate_stock_size(stock_size):
         raise serializers.ValidationError('Stock  size has to be positive.')
 
 
-class AvailableStockField(serializers.CharField):
-    def to_representation(self, value):
-        return value.stock_size
-
-
 class ProductDataSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -24,7 +22,7 @@ class ProductDataSerializer(serializers.ModelSerializer):
 
 class ProductSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField()
-    available_stock = AvailableStockField(read_only=True)
+    available_stock = serializers.ReadOnlyField(source='current_stock')
 
     class Meta:
         model = Product
@@ -33,7 +31,8 @@ class ProductSerializer(serializers.ModelSerializer):
                   'code',
                   'price',
                   'unit',
-                  'available_stock')
+                  'available_stock',
+                  'reorder_threshold')
 
 
 class ProductStockSerializer(serializers.Serializer):
@@ -60,9 +59,7 @@ class IncreaseProductStockSerializer(serializers.Serializer):
     def create(self, validated_data):
         product_id = validated_data.get('product_id')
         stock_add_value = validated_data.get('stock_size')
-        current_stock = ProductStock.objects.filter(product_id=product_id).latest('update_timestamp')
-        new_stock_size = current_stock.stock_size + stock_add_value
-        return ProductStock.objects.create(product_id=product_id, stock_size=new_stock_size)
+        return stock.add_stock(product_id, stock_add_value)
 
 
 class DecreaseProductStockSerializer(serializers.Serializer):
@@ -74,11 +71,69 @@ class DecreaseProductStockSerializer(serializers.Serializer):
     def create(self, validated_data):
         product_id = validated_data.get('product_id')
         stock_remove_value = validated_data.get('stock_size')
-        current_stock = ProductStock.objects.filter(product_id=product_id).latest('update_timestamp')
-        new_stock_size = current_stock.stock_size - stock_remove_value
-        print(new_stock_size)
-        if new_stock_size >= 0:
-            return ProductStock.objects.create(product_id=product_id, stock_size=new_stock_size)
-        else:
-            raise serializers.ValidationError(f"Not enough products in stock. Available stock: {current_stock}.")
+        try:
+            return stock.remove_stock(product_id, stock_remove_value)
+        except stock.InsufficientStock as e:
+            raise serializers.ValidationError(str(e))
+
+
+
+class LowStockProductSerializer(serializers.ModelSerializer):
+    code = serializers.ReadOnlyField(source='product.code')
+    name = serializers.ReadOnlyField(source='product.name')
+    unit = serializers.ReadOnlyField(source='product.unit')
+    available_stock = serializers.ReadOnlyField(source='product.current_stock')
+    reorder_threshold = serializers.ReadOnlyField(source='product.reorder_threshold')
+
+    class Meta:
+        model = LowStockProduct
+        fields = ('product_id',
+                  'code',
+                  'name',
+                  'unit',
+                  'available_stock',
+                  'reorder_threshold',
+                  'since')
+
+
+class StockChangeSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    delta = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
+    stock_size = serializers.DecimalField(max_digits=12, decimal_places=2, required=False,
+                                          validators=[validate_stock_size])
+
+    def validate(self, data):
+        if ('delta' in data) == ('stock_size' in data):
+            raise serializers.ValidationError('Either delta or stock_size has to be provided.')
+        return data
+
+
+class PriceHistogramOptionsSerializer(serializers.Serializer):
+    buckets = serializers.IntegerField(min_value=1, max_value=settings.MAX_PRICE_HISTOGRAM_BUCKETS, default=10)
+    mode = serializers.ChoiceField(choices=HISTOGRAM_MODES, default='fixed')
+
+
+class PriceBucketSerializer(serializers.Serializer):
+    lower = serializers.DecimalField(max_digits=8, decimal_places=2)
+    upper = serializers.DecimalField(max_digits=8, decimal_places=2)
+    count = serializers.IntegerField()
+
+
+class PriceHistogramSerializer(serializers.Serializer):
+    count = serializers.IntegerField()
+    min = serializers.DecimalField(max_digits=8, decimal_places=2, allow_null=True)
+    max = serializers.DecimalField(max_digits=8, decimal_places=2, allow_null=True)
+    mode = serializers.CharField()
+    buckets = PriceBucketSerializer(many=True)
+
+
+class ProductImportSerializer(ProductDataSerializer):
+    """
+    Validates imported product rows with the ProductDataSerializer rules. Codes are not
+    checked for uniqueness, since rows with an existing code update that product.
+    """
 
+    class Meta(ProductDataSerializer.Meta):
+        extra_kwargs = {
+            'code': {'validators': []},
+        }
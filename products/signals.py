@@ -0,0 +1,23 @@
+from django.db import connections
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .cache import catalog
+from .models import Product, ProductStock
+from .search import SEARCH_TABLE, install_search_index
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_cached_product(sender, instance, **kwargs):
+    catalog.invalidate([instance.pk])
+
+
+@receiver(post_save, sender=ProductStock)
+def invalidate_cached_product_stock(sender, instance, **kwargs):
+    catalog.invalidate([instance.product_id])
+
+
+def repair_search_index(sender, using, **kwargs):
+    # rebuilding the product table in a migration drops the triggers of the search index
+    connection = connections[using]
+    if SEARCH_TABLE in connection.introspection.table_names():
+        install_search_index(connection)
@@ -0,0 +1,292 @@
+import heapq
+from django.db import models, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from config.exports import IN_CLAUSE_CHUNK_SIZE, chunked
+from .cache import catalog
+from .models import Product, ProductStock, ProductStockArchive, LowStockProduct, latest_stock_expressions
+
+
+class InsufficientStock(Exception):
+    """
+    Raised when a stock reduction would make the product stock negative.
+    """
+
+    def __init__(self, product_id, stock_size, unit):
+        self.product_id = product_id
+        self.stock_size = stock_size
+        self.unit = unit
+        super().__init__(f"Not enough products in stock. Available stock: {stock_size} {unit}(s).")
+
+
+def add_stock(product_id, quantity):
+    """
+    Increases the stock of a product by `quantity` and records the new stock size in the stock ledger.
+    """
+    return change_stock(product_id, quantity)
+
+
+def remove_stock(product_id, quantity):
+    """
+    Decreases the stock of a product by `quantity` and records the new stock size in the stock ledger.
+    Raises `InsufficientStock` if the product does not have enough stock.
+    """
+    return change_stock(product_id, -quantity)
+
+
+def change_stock(product_id, delta):
+    """
+    Applies `delta` to the current stock of a product.
+
+    The availability check and the change are done by a single conditional UPDATE,
+    which locks only the product row until the transaction commits, so concurrent
+    requests can not both pass the check and oversell the product.
+    """
+    with transaction.atomic():
+        products = Product.objects.filter(pk=product_id)
+        if delta < 0:
+            products = products.filter(current_stock__gte=-delta)
+
+        if not products.update(current_stock=F('current_stock') + delta):
+            # either the product does not exist, or there is not enough stock
+            product = Product.objects.values('current_stock', 'unit').get(pk=product_id)
+            raise InsufficientStock(product_id, product['current_stock'], product['unit'])
+
+        stock_size = Product.objects.values_list('current_stock', flat=True).get(pk=product_id)
+        return ProductStock.objects.create(product_id=product_id, stock_size=stock_size)
+
+
+class _StockShortage(Exception):
+    pass
+
+
+def remove_stock_many(quantities):
+    """
+    Decreases the stock of many products at once, `quantities` mapping product ids to the
+    quantity removed, and records the new stock sizes in the stock ledger.
+
+    The availability checks and the changes of all the products are done by a single
+    conditional UPDATE, so concurrent requests can not both pass the check and oversell
+    a product. If any of the products does not have enough stock, no stock is changed and
+    `InsufficientStock` is raised; `Product.DoesNotExist` is raised for unknown products.
+    Keep `quantities` short enough for an `IN (...)` list.
+
+    Returns a dict of the new stock sizes by product id.
+    """
+    quantities = {int(product_id): quantity for product_id, quantity in quantities.items()}
+    removed = Case(*[When(pk=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+                   output_field=models.DecimalField(max_digits=12, decimal_places=2))
+    with transaction.atomic():
+        while True:
+            try:
+                with transaction.atomic():
+                    updated = (Product.objects
+                               .filter(pk__in=list(quantities), current_stock__gte=removed)
+                               .update(current_stock=F('current_stock') - removed))
+                    if updated != len(quantities):
+                        raise _StockShortage()
+                break
+            except _StockShortage:
+                # the partial update is rolled back, find a product without enough stock
+                products = Product.objects.filter(pk__in=list(quantities)).values_list('pk', 'current_stock', 'unit')
+                products = {product_id: (stock_size, unit) for product_id, stock_size, unit in products}
+                for product_id, quantity in quantities.items():
+                    if product_id not in products:
+                        raise Product.DoesNotExist(f"Product {product_id} does not exist.")
+                    stock_size, unit = products[product_id]
+                    if stock_size < quantity:
+                        raise InsufficientStock(product_id, stock_size, unit)
+                # the stock was increased in the meantime, try again
+
+        stock_sizes = dict(Product.objects.filter(pk__in=list(quantities)).values_list('pk', 'current_stock'))
+        ProductStock.objects.bulk_create(
+            [ProductStock(product_id=product_id, stock_size=stock_size) for product_id, stock_size in stock_sizes.items()]
+        )
+        sync_current_stock(stock_sizes)
+    return stock_sizes
+
+
+def current_stock_from_ledger():
+    """
+    Returns the update values that copy the latest ProductStock entry of every product
+    onto its current stock columns.
+    """
+    latest_stock = latest_stock_expressions()
+    return {
+        'current_stock': Coalesce(latest_stock['stock_size'], Value(0),
+                                  output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+        'current_stock_timestamp': latest_stock['stock_update_timestamp'],
+    }
+
+
+def sync_current_stock(product_ids):
+    """
+    Updates the current stock columns of the given products from the stock ledger, and the
+    low stock watchlist from the new values, with a few statements per chunk of products.
+    """
+    product_ids = list(product_ids)
+    updated = 0
+    for chunk in chunked(product_ids, IN_CLAUSE_CHUNK_SIZE):
+        updated += Product.objects.filter(pk__in=chunk).update(**current_stock_from_ledger())
+        LowStockProduct.objects.sync(chunk)
+    catalog.invalidate(product_ids)
+    return updated
+
+
+def bulk_change_stock(changes):
+    """
+    Applies many stock changes in one transaction.
+
+    Every change is a dict with a `product_id` and either a `delta` or an absolute `stock_size`.
+    Current stock is read with a few set-based queries, and the new ledger entries and stock
+    columns are written in bulk. Changes for unknown products, repeated products, or changes
+    that would make the stock negative are rejected, the remaining changes are applied.
+
+    Returns a list of per-change results, in the order of `changes`.
+    """
+    results = [None] * len(changes)
+    seen_product_ids = set()
+    for index, change in enumerate(changes):
+        if change['product_id'] in seen_product_ids:
+            results[index] = _rejected(change, 'Duplicate product_id in request.')
+        seen_product_ids.add(change['product_id'])
+
+    with transaction.atomic():
+        current_stock = {}
+        for product_ids in chunked(seen_product_ids, IN_CLAUSE_CHUNK_SIZE):
+            current_stock.update(
+                Product.objects.select_for_update().filter(pk__in=product_ids).values_list('pk', 'current_stock')
+            )
+
+        new_stock_entries = []
+        for index, change in enumerate(changes):
+            if results[index] is not None:
+                continue
+            product_id = change['product_id']
+            if product_id not in current_stock:
+                results[index] = _rejected(change, 'Product does not exist.')
+                continue
+            if change.get('stock_size') is not None:
+                stock_size = change['stock_size']
+            else:
+                stock_size = current_stock[product_id] + change['delta']
+            if stock_size < 0:
+                results[index] = _rejected(
+                    change, f'Not enough products in stock. Available stock: {current_stock[product_id]}.'
+                )
+                continue
+            new_stock_entries.append((index, ProductStock(product_id=product_id, stock_size=stock_size)))
+
+        entries = [entry for _, entry in new_stock_entries]
+        ProductStock.objects.bulk_create(entries, batch_size=IN_CLAUSE_CHUNK_SIZE)
+        sync_current_stock([entry.product_id for entry in entries])
+
+    for index, entry in new_stock_entries:
+        results[index] = {
+            'product_id': entry.product_id,
+            'status': 'updated',
+            'stock_size': entry.stock_size,
+            'update_timestamp': entry.update_timestamp,
+        }
+    return results
+
+
+SNAPSHOT_PERIODS = {
+    'day': lambda timestamp: timezone.localtime(timestamp).date(),
+    'week': lambda timestamp: timezone.localtime(timestamp).isocalendar()[:2],
+    'month': lambda timestamp: timezone.localtime(timestamp).strftime('%Y-%m'),
+}
+
+
+def compact_product_stock(product_id, before, period='day', batch_size=IN_CLAUSE_CHUNK_SIZE):
+    """
+    Moves the ProductStock entries of a product older than `before` that are superseded by a later
+    entry of the same period to ProductStockArchive.
+
+    Stock entries hold absolute stock sizes, so the last entry of every period is a snapshot of
+    the stock at the end of that period; it stays in the ledger together with every entry newer
+    than `before`, and the current stock is never affected. The entries are read in keyset pages
+    of `batch_size` and every page is archived in its own transaction, so an interrupted run
+    can be resumed by simply running it again.
+
+    Returns the number of archived entries.
+    """
+    period_of = SNAPSHOT_PERIODS[period]
+    entries = (ProductStock.objects
+               .filter(product_id=product_id, update_timestamp__lt=before)
+               .order_by('update_timestamp', 'id')
+               .values_list('update_timestamp', 'id'))
+    archived = 0
+    previous_entry = None
+    last_key = None
+    while True:
+        page = entries
+        if last_key is not None:
+            page = page.filter(Q(update_timestamp__gt=last_key[0]) |
+                               Q(update_timestamp=last_key[0], id__gt=last_key[1]))
+        page = list(page[:batch_size])
+        if not page:
+            break
+
+        superseded = []
+        for update_timestamp, entry_id in page:
+            entry_period = period_of(update_timestamp)
+            if previous_entry is not None and previous_entry[1] == entry_period:
+                superseded.append(previous_entry[0])
+            previous_entry = (entry_id, entry_period)
+        archived += archive_stock_entries(superseded)
+        last_key = page[-1]
+    return archived
+
+
+def archive_stock_entries(entry_ids):
+    """
+    Moves the given ProductStock entries to ProductStockArchive in one transaction.
+    """
+    archived = 0
+    with transaction.atomic():
+        for chunk in chunked(entry_ids, IN_CLAUSE_CHUNK_SIZE):
+            entries = ProductStock.objects.filter(pk__in=chunk)
+            ProductStockArchive.objects.bulk_create(
+                [ProductStockArchive(**entry) for entry in
+                 entries.values('id', 'product_id', 'stock_size', 'update_timestamp')],
+                ignore_conflicts=True
+            )
+            archived += entries.delete()[0]
+    return archived
+
+
+def stock_history(product_id, since=None, until=None, before=None, limit=100):
+    """
+    Returns up to `limit` stock entries of a product, newest first, from both the stock ledger
+    and the stock archive, so the history does not change when the ledger is compacted.
+
+    `before` is the (update_timestamp, id) keyset position of the last entry of the previous page.
+    Every page is read with one indexed range scan per table, so deep pages cost the same as
+    the first one.
+    """
+    def history_page(model):
+        entries = model.objects.filter(product_id=product_id)
+        if since is not None:
+            entries = entries.filter(update_timestamp__gte=since)
+        if until is not None:
+            entries = entries.filter(update_timestamp__lte=until)
+        if before is not None:
+            entries = entries.filter(Q(update_timestamp__lt=before[0]) |
+                                     Q(update_timestamp=before[0], id__lt=before[1]))
+        return list(entries.order_by('-update_timestamp', '-id')[:limit])
+
+    return heapq.nlargest(
+        limit,
+        history_page(ProductStock) + history_page(ProductStockArchive),
+        key=lambda entry: (entry.update_timestamp, entry.pk)
+    )
+
+
+def _rejected(change, error):
+    return {
+        'product_id': change['product_id'],
+        'status': 'rejected',
+        'error': error,
+    }
@@ -0,0 +1,81 @@
+import pytest
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from products import stock
+from products.checks import check_catalog_cache_backend
+from products.cache import CatalogCache, catalog
+from products.models import Product
+
+
+@pytest.mark.usefixtures("db", "three_products_db")
+class CatalogCacheTest(APITestCase):
+    product_id = 1
+
+    def test_cached_product_is_read_without_queries(self):
+        product = catalog.get(self.product_id)
+        assert product == Product.objects.get(pk=self.product_id)
+
+        with self.assertNumQueries(0):
+            assert catalog.get(self.product_id).name == product.name
+            assert catalog.get_by_code(product.code).pk == self.product_id
+
+    def test_many_products_are_read_in_one_query(self):
+        with self.assertNumQueries(1):
+            products = catalog.get_many([1, 2, 3, 999])
+        assert sorted(products) == [1, 2, 3]
+
+    def test_product_update_invalidates_cached_product(self):
+        catalog.get(self.product_id)
+
+        product = Product.objects.get(pk=self.product_id)
+        product.price = 42
+        product.save()
+
+        assert catalog.get(self.product_id).price == 42
+
+    def test_stock_changes_invalidate_cached_product(self):
+        catalog.get(self.product_id)
+
+        stock.add_stock(self.product_id, 10)
+        assert catalog.get(self.product_id).current_stock == 10
+
+        stock.bulk_change_stock([{'product_id': self.product_id, 'delta': -4}])
+        assert catalog.get(self.product_id).current_stock == 6
+
+    def test_deleted_product_is_not_returned(self):
+        catalog.get(self.product_id)
+
+        Product.objects.get(pk=self.product_id).delete()
+
+        assert catalog.get(self.product_id) is None
+
+    def test_changes_are_seen_by_other_processes(self):
+        # an independent cache stands for the cache of another worker process
+        other_process_catalog = CatalogCache(max_size=10)
+        assert other_process_catalog.get(self.product_id).name == Product.objects.get(pk=self.product_id).name
+
+        product = Product.objects.get(pk=self.product_id)
+        product.name = 'Renamed Product'
+        product.save()
+
+        assert other_process_catalog.get(self.product_id).name == 'Renamed Product'
+
+    def test_least_recently_used_products_are_evicted(self):
+        small_catalog = CatalogCache(max_size=2)
+        small_catalog.get(1)
+        small_catalog.get(2)
+        small_catalog.get(1)
+        small_catalog.get(3)
+
+        with self.assertNumQueries(0):
+            small_catalog.get(1)
+            small_catalog.get(3)
+        with self.assertNumQueries(1):
+            small_catalog.get(2)
+
+    def test_process_local_cache_backend_is_reported(self):
+        assert [warning.id for warning in check_catalog_cache_backend(None)] == ['products.W001']
+
+        shared_cache = {'default': {'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache'}}
+        with override_settings(CACHES=shared_cache):
+            assert check_catalog_cache_backend(None) == []
@@ -0,0 +1,101 @@
+import pytest
+from rest_framework.reverse import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.test import force_authenticate
+from products.models import Product
+from products.views import ProductListView, ProductDetailView, ProductStockView
+
+
+@pytest.mark.usefixtures("db", "three_products_db", "regular_user", "member_of_staff")
+class ProductConditionalGetTest(APITestCase):
+    product_id = 1
+    factory = APIRequestFactory()
+
+    def get(self, view, url, user=None, **headers):
+        request = self.factory.get(url, **headers)
+        force_authenticate(request, user=user or self.member_of_staff)
+        response = view(request)
+        response.render()
+        return response
+
+    def get_product(self, **headers):
+        url = reverse(ProductDetailView.name, kwargs={'pk': self.product_id})
+        request = self.factory.get(url, **headers)
+        force_authenticate(request, user=self.member_of_staff)
+        response = ProductDetailView.as_view()(request, pk=self.product_id)
+        response.render()
+        return response
+
+    def test_unchanged_product_is_not_modified(self):
+        response = self.get_product()
+        assert response.status_code == status.HTTP_200_OK
+        assert response.has_header('Last-Modified')
+
+        # the validators of a cached product are checked without database queries
+        with self.assertNumQueries(0):
+            response = self.get_product(HTTP_IF_NONE_MATCH=response['ETag'])
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        # Response Content
+        assert response.content == b''
+
+    def test_product_and_stock_changes_modify_product(self):
+        etag = self.get_product()['ETag']
+
+        Product.objects.get(pk=self.product_id).add_stock(5)
+        response = self.get_product(HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        etag = response['ETag']
+
+        product = Product.objects.get(pk=self.product_id)
+        product.price = 42
+        product.save()
+        assert self.get_product(HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    def test_product_not_modified_since(self):
+        last_modified = self.get_product()['Last-Modified']
+
+        response = self.get_product(HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_permissions_are_checked_before_validators(self):
+        etag = self.get_product()['ETag']
+
+        url = reverse(ProductDetailView.name, kwargs={'pk': self.product_id})
+        request = self.factory.get(url, HTTP_IF_NONE_MATCH=etag)
+        force_authenticate(request, user=self.regular_user)
+        response = ProductDetailView.as_view()(request, pk=self.product_id)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_product_stock_conditional_get(self):
+        url = reverse(ProductStockView.name, kwargs={'product_id': self.product_id})
+
+        def get_stock(**headers):
+            request = self.factory.get(url, **headers)
+            force_authenticate(request, user=self.member_of_staff)
+            return ProductStockView.as_view()(request, product_id=self.product_id)
+
+        etag = get_stock()['ETag']
+        assert get_stock(HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+
+        Product.objects.get(pk=self.product_id).add_stock(5)
+        assert get_stock(HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    def test_product_list_conditional_get(self):
+        view = ProductListView.as_view()
+        url = reverse(ProductListView.name)
+        etag = self.get(view, url)['ETag']
+
+        assert self.get(view, url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+        # the validators of a list depend on its filters
+        assert self.get(view, url + '?min_price=4', HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+        Product.objects.create(name='Test-Product-New', code='TP-New', price=1, unit='item')
+        assert self.get(view, url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
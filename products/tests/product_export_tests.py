@@ -0,0 +1,77 @@
+import csv
+import json
+import pytest
+from io import StringIO
+from rest_framework.reverse import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.test import force_authenticate
+from config.exports import StreamingExportView
+from products.models import Product
+from products.views import ProductExportView
+
+
+@pytest.mark.usefixtures("db", "three_products_db", "regular_user", "store_administrator")
+class ProductExportViewTest(APITestCase):
+    view = ProductExportView
+    url = reverse(view.name)
+    factory = APIRequestFactory()
+
+    def export(self, params=None, user=None):
+        view = self.view.as_view()
+        request = self.factory.get(self.url, params)
+        force_authenticate(request, user=user or self.store_administrator)
+        return view(request)
+
+    def test_anonymous_cant_export_products(self):
+        view = self.view.as_view()
+        response = view(self.factory.get(self.url))
+        response.render()
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_products_are_exported_as_ndjson(self):
+        Product.objects.get(pk=2).add_stock(12)
+
+        response = self.export()
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'application/x-ndjson'
+
+        # Response Content
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        products = [json.loads(line) for line in lines]
+        assert [product['code'] for product in products] == ['TP-3', 'TP-4', 'TP-5']
+        assert products[1]['available_stock'] == '12.00'
+
+    def test_products_are_exported_as_csv(self):
+        response = self.export({'output': 'csv', 'min_price': 4})
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Disposition'] == 'attachment; filename="products.csv"'
+
+        # Response Content
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(StringIO(content)))
+        expected_codes = Product.objects.filter(price__gte=4).order_by('pk').values_list('code', flat=True)
+        assert [row['code'] for row in rows] == list(expected_codes)
+
+    def test_rows_are_exported_by_default(self):
+        class CodeExportView(StreamingExportView):
+            queryset = Product.objects.all()
+            csv_fieldnames = ('id', 'code')
+
+        request = self.factory.get(self.url, {'output': 'csv'})
+        force_authenticate(request, user=self.store_administrator)
+        response = CodeExportView.as_view()(request)
+
+        # Response Content
+        content = b''.join(response.streaming_content).decode()
+        assert list(csv.DictReader(StringIO(content))) == [
+            {'id': str(product_id), 'code': code}
+            for product_id, code in Product.objects.order_by('pk').values_list('id', 'code')
+        ]
@@ -0,0 +1,83 @@
+import pytest
+from rest_framework.reverse import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.test import force_authenticate
+from products.models import Product
+from products.views import ProductPriceHistogramView
+
+
+@pytest.mark.usefixtures("db", "regular_user", "store_administrator")
+class ProductPriceHistogramViewTest(APITestCase):
+    view = ProductPriceHistogramView
+    url = reverse(view.name)
+    factory = APIRequestFactory()
+
+    def setUp(self):
+        for i, price in enumerate([1, 2, 2, 3, 10]):
+            Product.objects.create(name=f'Test-Product-{i}', code=f'TP-{i}', price=price, unit='item')
+
+    def get_histogram(self, params=None, user=None):
+        view = self.view.as_view()
+        request = self.factory.get(self.url, params)
+        force_authenticate(request, user=user or self.store_administrator)
+        response = view(request)
+        response.render()
+        return response
+
+    def test_regular_user_cant_view_price_histogram(self):
+        response = self.get_histogram(user=self.regular_user)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_fixed_width_histogram(self):
+        response = self.get_histogram({'buckets': 3})
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_200_OK
+
+        # Response Content
+        assert response.content == (
+            b'{"count":5,"min":"1.00","max":"10.00","mode":"fixed","buckets":['
+            b'{"lower":"1.00","upper":"4.00","count":4},'
+            b'{"lower":"4.00","upper":"7.00","count":0},'
+            b'{"lower":"7.00","upper":"10.00","count":1}]}'
+        )
+
+    def test_quantile_histogram_of_filtered_products(self):
+        response = self.get_histogram({'buckets': 2, 'mode': 'quantile', 'min_price': 2})
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_200_OK
+
+        # Response Content
+        assert response.content == (
+            b'{"count":4,"min":"2.00","max":"10.00","mode":"quantile","buckets":['
+            b'{"lower":"2.00","upper":"2.00","count":2},'
+            b'{"lower":"3.00","upper":"10.00","count":2}]}'
+        )
+
+    def test_histogram_of_no_products(self):
+        response = self.get_histogram({'min_price': 100})
+
+        # Response Content
+        assert response.content == b'{"count":0,"min":null,"max":null,"mode":"fixed","buckets":[]}'
+
+    def test_histogram_is_cached_per_filter(self):
+        self.get_histogram({'min_price': 2, 'buckets': 2})
+        Product.objects.create(name='Test-Product-New', code='TP-New', price=5, unit='item')
+
+        # the same filters in another order are served from the cache
+        response = self.get_histogram({'buckets': 2, 'min_price': 2})
+        assert response.data['count'] == 4
+        response = self.get_histogram({'buckets': 2, 'min_price': 1})
+        assert response.data['count'] == 6
+
+    def test_invalid_histogram_options(self):
+        response = self.get_histogram({'buckets': 0, 'mode': 'linear'})
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert set(response.data) == {'buckets', 'mode'}
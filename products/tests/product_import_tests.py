@@ -0,0 +1,75 @@
+import json
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+from products.models import Product, ProductStock
+
+
+@pytest.mark.usefixtures("db", "three_products_db")
+class ImportProductsCommandTest(APITestCase):
+
+    def import_products(self, tmp_path, filename, content, **options):
+        path = tmp_path / filename
+        path.write_text(content)
+        output, errors = StringIO(), StringIO()
+        call_command('import_products', str(path), stdout=output, stderr=errors, **options)
+        return output.getvalue(), errors.getvalue()
+
+    @pytest.fixture(autouse=True)
+    def inject_tmp_path(self, tmp_path):
+        self.tmp_path = tmp_path
+
+    def test_import_csv(self):
+        content = ('name,code,price,unit\n'
+                   'Imported Product 1,IMP-1,10.50,item\n'
+                   'Imported Product 2,IMP-2,3,kg\n')
+        output, errors = self.import_products(self.tmp_path, 'products.csv', content, chunk_size=1)
+
+        assert '2 created' in output
+        assert 'rows/sec' in output
+        product = Product.objects.get(code='IMP-1')
+        assert product.name == 'Imported Product 1'
+        assert product.price == 10.50
+        assert product.unit == 'item'
+
+        # every new product gets its initial stock entry
+        for product in Product.objects.filter(code__in=('IMP-1', 'IMP-2')):
+            latest_stock = ProductStock.objects.filter(product=product).latest('update_timestamp')
+            assert latest_stock.stock_size == 0
+            assert product.current_stock == 0
+            assert product.current_stock_timestamp == latest_stock.update_timestamp
+
+    def test_import_jsonl_updates_existing_products(self):
+        existing_product = Product.objects.get(pk=1)
+        unchanged_product = Product.objects.get(pk=2)
+        stock_entries_before_import = ProductStock.objects.count()
+        rows = [
+            {'name': 'Updated Name', 'code': existing_product.code, 'price': '99.99', 'unit': 'box'},
+            {'name': unchanged_product.name, 'code': unchanged_product.code,
+             'price': str(unchanged_product.price), 'unit': unchanged_product.unit},
+            {'name': 'Imported Product', 'code': 'IMP-3', 'price': '1', 'unit': 'item'},
+        ]
+        content = '\n'.join(json.dumps(row) for row in rows)
+        output, errors = self.import_products(self.tmp_path, 'products.jsonl', content)
+
+        assert '1 created, 1 updated, 1 unchanged' in output
+        existing_product.refresh_from_db()
+        assert existing_product.name == 'Updated Name'
+        assert existing_product.unit == 'box'
+        assert Product.objects.get(pk=2).update_timestamp == unchanged_product.update_timestamp
+        # only the new product gets a stock entry
+        assert ProductStock.objects.count() == stock_entries_before_import + 1
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        content = ('name,code,price,unit\n'
+                   'Valid Product,IMP-4,1,item\n'
+                   'Negative Price,IMP-5,-1,item\n'
+                   ',IMP-6,1,item\n')
+        output, errors = self.import_products(self.tmp_path, 'products.csv', content)
+
+        assert '1 created' in output
+        assert '2 invalid' in output
+        assert 'Line 3' in errors
+        assert 'Line 4' in errors
+        assert not Product.objects.filter(code__in=('IMP-5', 'IMP-6')).exists()
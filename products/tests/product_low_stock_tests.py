@@ -0,0 +1,81 @@
+import pytest
+from rest_framework.reverse import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.test import force_authenticate
+from products import stock
+from products.models import Product, LowStockProduct
+from products.views import ProductLowStockView
+
+
+@pytest.mark.usefixtures("db", "three_products_db", "regular_user", "member_of_staff")
+class ProductLowStockTest(APITestCase):
+    view = ProductLowStockView
+    url = reverse(view.name)
+    factory = APIRequestFactory()
+    product_id = 1
+
+    def setUp(self):
+        product = Product.objects.get(pk=self.product_id)
+        product.reorder_threshold = 10
+        product.save()
+
+    def low_stock_ids(self):
+        return list(LowStockProduct.objects.values_list('product_id', flat=True))
+
+    def test_threshold_change_updates_watchlist(self):
+        assert self.low_stock_ids() == [self.product_id]
+
+        product = Product.objects.get(pk=self.product_id)
+        product.reorder_threshold = 0
+        product.save()
+        assert self.low_stock_ids() == []
+
+    def test_stock_changes_update_watchlist(self):
+        stock.add_stock(self.product_id, 15)
+        assert self.low_stock_ids() == []
+
+        stock.remove_stock(self.product_id, 6)
+        assert self.low_stock_ids() == [self.product_id]
+
+        stock.bulk_change_stock([{'product_id': self.product_id, 'stock_size': 10}])
+        assert self.low_stock_ids() == []
+
+        Product.objects.get(pk=self.product_id).add_stock(3)
+        assert self.low_stock_ids() == [self.product_id]
+
+    def test_product_stays_on_watchlist_since_it_was_added(self):
+        since = LowStockProduct.objects.get(pk=self.product_id).since
+
+        stock.add_stock(self.product_id, 2)
+
+        assert LowStockProduct.objects.get(pk=self.product_id).since == since
+
+    def test_regular_user_cant_view_low_stock_products(self):
+        request = self.factory.get(self.url)
+        force_authenticate(request, user=self.regular_user)
+        response = self.view.as_view()(request)
+        response.render()
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_low_stock_products_are_listed(self):
+        stock.add_stock(self.product_id, 4)
+
+        request = self.factory.get(self.url)
+        force_authenticate(request, user=self.member_of_staff)
+        # one query for the page and one for the count
+        with self.assertNumQueries(2):
+            response = self.view.as_view()(request)
+            response.render()
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_200_OK
+        # Response Content
+        product = response.data['results'][0]
+        assert response.data['count'] == 1
+        assert product['code'] == Product.objects.get(pk=self.product_id).code
+        assert str(product['available_stock']) == '4.00'
+        assert str(product['reorder_threshold']) == '10.00'
@@ -0,0 +1,173 @@
+from datetime import datetime, timezone
+from io import StringIO
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.reverse import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.test import force_authenticate
+from products.models import Product, ProductStock, ProductStockArchive
+from products.stock import sync_current_stock
+from products.views import ProductListView
+
+
+@pytest.mark.usefixtures("db", "three_products_db", "member_of_staff")
+class ProductCurrentStockTest(APITestCase):
+    product_id = 1
+
+    def test_new_product_has_zero_current_stock(self):
+        product = Product.objects.get(pk=self.product_id)
+        latest_stock = ProductStock.objects.filter(product=product).latest('update_timestamp')
+
+        assert product.current_stock == 0
+        assert product.current_stock_timestamp == latest_stock.update_timestamp
+
+    def test_current_stock_follows_stock_ledger(self):
+        product = Product.objects.get(pk=self.product_id)
+        product.add_stock(120)
+        # the in-memory instance is kept in sync as well
+        assert product.current_stock == 120
+
+        ProductStock.objects.create(product_id=self.product_id, stock_size=80)
+        product = Product.objects.get(pk=self.product_id)
+        latest_stock = ProductStock.objects.filter(product=product).latest('update_timestamp')
+        assert product.current_stock == 80
+        assert product.current_stock_timestamp == latest_stock.update_timestamp
+
+    def test_current_stock_follows_stock_entry_deletes(self):
+        product = Product.objects.get(pk=self.product_id)
+        first_stock = product.add_stock(120)
+        latest_stock = product.add_stock(80)
+
+        latest_stock.delete()
+        # the in-memory instance is kept in sync as well
+        assert product.current_stock == 120
+        product = Product.objects.get(pk=self.product_id)
+        assert product.current_stock == 120
+        assert product.current_stock_timestamp == first_stock.update_timestamp
+
+        ProductStock.objects.filter(product_id=self.product_id).delete()
+        product = Product.objects.get(pk=self.product_id)
+        assert product.current_stock == 0
+        assert product.current_stock_timestamp is None
+
+    def test_product_update_does_not_overwrite_current_stock(self):
+        product = Product.objects.get(pk=self.product_id)
+        # stock changes while another request holds a stale product instance
+        ProductStock.objects.create(product_id=self.product_id, stock_size=35)
+
+        product.name = 'Renamed Product'
+        product.save()
+
+        product = Product.objects.get(pk=self.product_id)
+        assert product.name == 'Renamed Product'
+        assert product.current_stock == 35
+
+    def test_rebuild_current_stock_command(self):
+        ProductStock.objects.create(product_id=self.product_id, stock_size=15)
+        Product.objects.update(current_stock=999, current_stock_timestamp=None)
+
+        call_command('rebuild_current_stock', batch_size=2, stdout=StringIO())
+
+        for product in Product.objects.all():
+            latest_stock = product.stock.latest('update_timestamp')
+            assert product.current_stock == latest_stock.stock_size
+            assert product.current_stock_timestamp == latest_stock.update_timestamp
+
+    def test_product_list_query_count_does_not_depend_on_page_size(self):
+        view = ProductListView.as_view()
+        url = reverse(ProductListView.name)
+        factory = APIRequestFactory()
+
+        def count_list_queries():
+            request = factory.get(url)
+            force_authenticate(request, user=self.member_of_staff)
+            with CaptureQueriesContext(connection) as context:
+                response = view(request)
+                response.render()
+            assert response.status_code == status.HTTP_200_OK
+            return len(context.captured_queries)
+
+        queries_for_three_products = count_list_queries()
+        for i in range(10, 20):
+            Product.objects.create(name=f'Test-Product-{i}', code=f'TP-{i}', price=i, unit='item')
+        assert count_list_queries() == queries_for_three_products
+
+
+@pytest.mark.usefixtures("db", "three_products_db")
+class ProductStockCompactionTest(APITestCase):
+    product_id = 1
+
+    def add_stock_entry(self, stock_size, update_timestamp):
+        entry = ProductStock.objects.create(product_id=self.product_id, stock_size=stock_size)
+        ProductStock.objects.filter(pk=entry.pk).update(update_timestamp=update_timestamp)
+        return entry
+
+    def setUp(self):
+        # the initial entry of the product, created together with the product
+        ProductStock.objects.filter(product_id=self.product_id).update(
+            update_timestamp=datetime(2021, 1, 1, 8, tzinfo=timezone.utc)
+        )
+        self.add_stock_entry(10, datetime(2021, 1, 1, 9, tzinfo=timezone.utc))
+        self.add_stock_entry(20, datetime(2021, 1, 1, 17, tzinfo=timezone.utc))
+        self.add_stock_entry(15, datetime(2021, 1, 2, 10, tzinfo=timezone.utc))
+        self.add_stock_entry(5, datetime(2021, 1, 2, 11, tzinfo=timezone.utc))
+        self.latest_entry = self.add_stock_entry(7, datetime(2021, 2, 1, 12, tzinfo=timezone.utc))
+        sync_current_stock([self.product_id])
+
+    def test_superseded_entries_are_archived(self):
+        call_command('compact_stock_ledger', before='2021-01-31', batch_size=2, stdout=StringIO())
+
+        # one snapshot entry per day is kept, together with the entries newer than the cutoff
+        kept_entries = ProductStock.objects.filter(product_id=self.product_id).order_by('update_timestamp')
+        assert [entry.stock_size for entry in kept_entries] == [20, 5, 7]
+        archived_entries = ProductStockArchive.objects.filter(product_id=self.product_id).order_by('update_timestamp')
+        assert [entry.stock_size for entry in archived_entries] == [0, 10, 15]
+
+        # current stock reads are unchanged
+        product = Product.objects.get(pk=self.product_id)
+        assert product.available_stock.pk == self.latest_entry.pk
+        assert product.current_stock == 7
+
+    def test_compaction_can_be_resumed(self):
+        call_command('compact_stock_ledger', before='2021-01-31', stdout=StringIO())
+        call_command('compact_stock_ledger', before='2021-01-31', stdout=StringIO())
+
+        assert ProductStock.objects.filter(product_id=self.product_id).count() == 3
+        assert ProductStockArchive.objects.filter(product_id=self.product_id).count() == 3
+
+    def test_monthly_snapshots(self):
+        call_command('compact_stock_ledger', before='2021-01-31', period='month', stdout=StringIO())
+
+        kept_entries = ProductStock.objects.filter(product_id=self.product_id).order_by('update_timestamp')
+        assert [entry.stock_size for entry in kept_entries] == [5, 7]
+
+
+@pytest.mark.usefixtures("db", "three_products_db")
+class ProductQuerySetTest(APITestCase):
+
+    def test_with_current_stock_matches_latest_stock_entry(self):
+        Product.objects.get(pk=1).add_stock(40)
+        Product.objects.get(pk=2).add_stock(25)
+
+        with self.assertNumQueries(1):
+            products = list(Product.objects.with_current_stock())
+
+        for product in products:
+            latest_stock = product.stock.latest('update_timestamp')
+            assert product.stock_size == latest_stock.stock_size
+            assert product.stock_update_timestamp == latest_stock.update_timestamp
+
+    def test_rebuild_current_stock_check(self):
+        Product.objects.filter(pk=2).update(current_stock=999)
+
+        output = StringIO()
+        call_command('rebuild_current_stock', check=True, stdout=output)
+
+        assert 'Product 2: current stock 999.00' in output.getvalue()
+        assert '1 product(s) with stale current stock.' in output.getvalue()
+        # checking does not modify anything
+        assert Product.objects.get(pk=2).current_stock == 999
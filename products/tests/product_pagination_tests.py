@@ -0,0 +1,82 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.reverse import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.test import force_authenticate
+from products.models import Product
+from products.views import ProductListView
+
+
+@pytest.mark.usefixtures("db", "member_of_staff")
+class ProductKeysetPaginationTest(APITestCase):
+    view = ProductListView
+    url = reverse(view.name)
+    factory = APIRequestFactory()
+
+    def setUp(self):
+        for i, price in enumerate([5, 3, 5, 1, 3, 5, 2]):
+            Product.objects.create(name=f'Test-Product-{i % 3}', code=f'TP-{i}', price=price, unit='item')
+
+    def get_page(self, url, params=None):
+        request = self.factory.get(url, params)
+        force_authenticate(request, user=self.member_of_staff)
+        response = self.view.as_view()(request)
+        response.render()
+        return response
+
+    def walk_pages(self, params):
+        codes = []
+        response = self.get_page(self.url, params)
+        while True:
+            assert response.status_code == status.HTTP_200_OK
+            assert 'count' not in response.data
+            codes += [product['code'] for product in response.data['results']]
+            if response.data['next'] is None:
+                return codes
+            response = self.get_page(response.data['next'])
+
+    def test_pages_follow_request_ordering(self):
+        codes = self.walk_pages({'cursor': '', 'limit': 2, 'ordering': '-price'})
+
+        expected_codes = Product.objects.order_by('-price', '-pk').values_list('code', flat=True)
+        assert codes == list(expected_codes)
+
+    def test_pages_follow_ordering_on_several_fields(self):
+        codes = self.walk_pages({'cursor': '', 'limit': 3, 'ordering': 'name,-price'})
+
+        expected_codes = Product.objects.order_by('name', '-price', 'pk').values_list('code', flat=True)
+        assert codes == list(expected_codes)
+
+    def test_pages_follow_default_ordering(self):
+        codes = self.walk_pages({'cursor': '', 'limit': 2})
+
+        assert codes == list(Product.objects.values_list('code', flat=True))
+
+    def test_page_cost_does_not_depend_on_position(self):
+        first_page = self.get_page(self.url, {'cursor': '', 'limit': 1, 'ordering': 'price'})
+        next_url = first_page.data['next']
+        for _ in range(4):
+            next_url = self.get_page(next_url).data['next']
+
+        with CaptureQueriesContext(connection) as context:
+            self.get_page(next_url)
+        sql = context.captured_queries[-1]['sql']
+        assert 'OFFSET' not in sql and 'COUNT' not in sql
+
+    def test_limit_offset_pagination_is_the_default(self):
+        response = self.get_page(self.url, {'limit': 2, 'offset': 2})
+
+        assert response.data['count'] == Product.objects.count()
+        assert len(response.data['results']) == 2
+
+    def test_invalid_cursor(self):
+        # not a cursor, a position of three values for (code, id) ordering, and a price that is not a number
+        for params in ({'cursor': 'not-a-cursor'}, {'cursor': 'WzEsIDIsIDNd'},
+                       {'cursor': 'WyJhIiwgMV0=', 'ordering': 'price'}):
+            response = self.get_page(self.url, params)
+
+            # Response Status Code
+            assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,101 @@
+import pytest
+from django.db import connection
+from rest_framework.reverse import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.request import Request
+from rest_framework.test import force_authenticate
+from products import search
+from products.models import Product
+from products.search import ProductSearchFilter
+from products.views import ProductListView
+
+
+def search_products(user, **params):
+    request = APIRequestFactory().get(reverse(ProductListView.name), params)
+    force_authenticate(request, user=user)
+    response = ProductListView.as_view()(request)
+    response.render()
+    assert response.status_code == status.HTTP_200_OK
+    return [product['code'] for product in response.data['results']]
+
+
+@pytest.mark.usefixtures("db", "store_administrator")
+class ProductSearchTest(APITestCase):
+
+    def setUp(self):
+        if not search.search_index_available(connection.alias):
+            self.skipTest('SQLite FTS5 is not available')
+        Product.objects.create(name='Green Tea', code='GT-1', price=3, unit='box')
+        Product.objects.create(name='Green Tea Green Label', code='GT-2', price=4, unit='box')
+        Product.objects.create(name='Black Coffee', code='BC-1', price=5, unit='kg')
+
+    def test_search_by_name_words(self):
+        # ranked by relevance rather than by id
+        assert search_products(self.store_administrator, search='green') == ['GT-2', 'GT-1']
+        assert search_products(self.store_administrator, search='green tea', ordering='code') == ['GT-1', 'GT-2']
+        assert search_products(self.store_administrator, search='coff') == ['BC-1']
+        assert search_products(self.store_administrator, search='milk') == []
+
+    def test_search_by_code_prefix(self):
+        assert search_products(self.store_administrator, search='GT', ordering='code') == ['GT-1', 'GT-2']
+        assert search_products(self.store_administrator, search='BC-1') == ['BC-1']
+
+    def test_search_index_follows_product_changes(self):
+        product = Product.objects.get(code='BC-1')
+        product.name = 'Black Tea'
+        product.save()
+        Product.objects.filter(code='GT-1').delete()
+
+        assert search_products(self.store_administrator, search='tea', ordering='code') == ['BC-1', 'GT-2']
+        assert search_products(self.store_administrator, search='coffee') == []
+
+    def test_regular_search_without_search_index(self):
+        search._search_index_available[connection.alias] = False
+        try:
+            assert search_products(self.store_administrator, search='Tea', ordering='code') == ['GT-1', 'GT-2']
+        finally:
+            search._search_index_available.pop(connection.alias)
+
+
+@pytest.mark.slow
+@pytest.mark.usefixtures("db", "store_administrator")
+class ProductSearchBenchmark(APITestCase):
+    catalog_size = 500000
+
+    def test_search_benchmark(self):
+        if not search.search_index_available(connection.alias):
+            self.skipTest('SQLite FTS5 is not available')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                WITH RECURSIVE sequence(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM sequence WHERE n < %s)
+                INSERT INTO products_product (name, code, price, unit, create_timestamp, update_timestamp,
+                                              current_stock, reorder_threshold)
+                SELECT printf('Product %%d Model %%d', n, n %% 997), printf('P-%%d', n), 1, 'item',
+                       datetime('now'), datetime('now'), 0, 0
+                FROM sequence
+                """,
+                [self.catalog_size]
+            )
+
+        assert search_products(self.store_administrator, search='Product 123456') == ['P-123456']
+
+        def search_plan():
+            request = Request(APIRequestFactory().get(reverse(ProductListView.name), {'search': 'Product 123456'}))
+            products = ProductSearchFilter().filter_queryset(request, Product.objects.all(), ProductListView())
+            return [line.split(' ', 3)[-1] for line in products.explain().splitlines()]
+
+        # the matching products are read from the full-text index, then by primary key
+        full_text_plan = search_plan()
+        assert f'SCAN {search.SEARCH_TABLE} VIRTUAL TABLE INDEX 0:M2' in full_text_plan
+        assert 'SEARCH products_product USING INTEGER PRIMARY KEY (rowid=?)' in full_text_plan
+        assert not any(line.startswith('SCAN products_product ') for line in full_text_plan)
+
+        # while the regular search reads the whole product table
+        search._search_index_available[connection.alias] = False
+        try:
+            assert any(line.startswith('SCAN products_product ') for line in search_plan())
+        finally:
+            search._search_index_available.pop(connection.alias)
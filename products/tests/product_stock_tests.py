@@ -1,13 +1,19 @@
+import threading
+from datetime import datetime, timezone
 import pytest
+from django.db import connection
 from rest_framework.reverse import reverse
 from rest_framework import status
 from rest_framework.renderers import JSONRenderer
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APITransactionTestCase
 from rest_framework.test import APIRequestFactory
 from rest_framework.test import force_authenticate
-from products.models import Product, ProductStock
+from products import stock
+from products.models import Product, ProductStock, ProductStockArchive
+from products.stock import compact_product_stock
 from products.serializers import ProductStockSerializer
 from products.views import ProductStockView, ProductAddStockView, ProductReduceStockView
+from products.views import ProductStockHistoryView, ProductBulkStockView
 
 @pytest.mark.usefixtures("db",
                          "three_products_db",
@@ -429,3 +435,244 @@ class ProductReduceStockViewTest(APITestCase):
         # Response Status Code
         assert response.status_code == status.HTTP_400_BAD_REQUEST
 
+
+
+@pytest.mark.usefixtures("transactional_db")
+class ProductStockConcurrencyTest(APITransactionTestCase):
+
+    def test_concurrent_reductions_do_not_oversell(self):
+        product = Product.objects.create(name='Hot Product', code='HOT-1', price=10, unit='item')
+        initial_stock = 10
+        product.add_stock(initial_stock)
+
+        number_of_requests = 25
+        results = []
+        start = threading.Barrier(number_of_requests)
+
+        def reduce_stock():
+            start.wait()
+            try:
+                stock.remove_stock(product.pk, 1)
+                results.append(True)
+            except stock.InsufficientStock:
+                results.append(False)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=reduce_stock) for _ in range(number_of_requests)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # exactly the available stock is sold, never more
+        assert results.count(True) == initial_stock
+        product.refresh_from_db()
+        assert product.current_stock == 0
+        assert product.stock.latest('update_timestamp').stock_size == 0
+
+    def test_concurrent_reductions_of_many_products_do_not_oversell(self):
+        hot_product = Product.objects.create(name='Hot Product', code='HOT-1', price=10, unit='item')
+        hot_product.add_stock(10)
+        other_product = Product.objects.create(name='Other Product', code='OTH-1', price=10, unit='item')
+        other_product.add_stock(20)
+
+        number_of_requests = 25
+        results = []
+        start = threading.Barrier(number_of_requests)
+
+        def reduce_stock():
+            start.wait()
+            try:
+                stock.remove_stock_many({hot_product.pk: 1, other_product.pk: 1})
+                results.append(True)
+            except stock.InsufficientStock:
+                results.append(False)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=reduce_stock) for _ in range(number_of_requests)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # the stock of all the products is reduced together, or not at all
+        assert results.count(True) == 10
+        for product, stock_size in ((hot_product, 0), (other_product, 10)):
+            product.refresh_from_db()
+            assert product.current_stock == stock_size
+            assert product.stock.latest('update_timestamp').stock_size == stock_size
+
+
+@pytest.mark.usefixtures("db",
+                         "three_products_db",
+                         "regular_user", "member_of_staff", "store_administrator")
+class ProductBulkStockViewTest(APITestCase):
+    view = ProductBulkStockView
+    url = reverse(view.name)
+    factory = APIRequestFactory()
+
+    def post_stock_changes(self, stock_changes, auth_user=None):
+        view = self.view.as_view()
+        request = self.factory.post(self.url, stock_changes, format='json')
+        if auth_user is not None:
+            force_authenticate(request, user=auth_user)
+        response = view(request)
+        response.render()
+        return response
+
+    def test_anonymous_cant_change_stock_in_bulk(self):
+        response = self.post_stock_changes([{"product_id": 1, "delta": "10"}])
+
+        # Response Content
+        assert response.content == b'{"detail":"Authentication credentials were not provided."}'
+        # Response Status Code
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_regular_user_cant_change_stock_in_bulk(self):
+        response = self.post_stock_changes([{"product_id": 1, "delta": "10"}], self.regular_user)
+
+        # Response Content
+        assert response.content == b'{"detail":"You do not have permission to perform this action."}'
+        # Response Status Code
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_store_administrator_can_change_stock_in_bulk(self):
+        Product.objects.get(pk=2).add_stock(30)
+        stock_entries_before_request = ProductStock.objects.count()
+
+        stock_changes = [
+            {"product_id": 1, "delta": "10"},
+            {"product_id": 2, "delta": "-5.50"},
+            {"product_id": 3, "stock_size": "7"},
+        ]
+        response = self.post_stock_changes(stock_changes, self.store_administrator)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_201_CREATED
+        # Response Content
+        assert [result['status'] for result in response.data] == ['updated', 'updated', 'updated']
+        assert [result['stock_size'] for result in response.data] == ['10.00', '24.50', '7.00']
+
+        # One ledger entry per change, and the current stock columns follow the ledger
+        assert ProductStock.objects.count() == stock_entries_before_request + 3
+        for product in Product.objects.filter(pk__in=(1, 2, 3)):
+            latest_stock = product.stock.latest('update_timestamp')
+            assert product.current_stock == latest_stock.stock_size
+            assert product.current_stock_timestamp == latest_stock.update_timestamp
+
+    def test_invalid_stock_changes_are_rejected_individually(self):
+        stock_entries_before_request = ProductStock.objects.count()
+
+        stock_changes = [
+            {"product_id": 1, "delta": "10"},
+            {"product_id": 2, "delta": "-5"},
+            {"product_id": 999, "delta": "5"},
+            {"product_id": 1, "delta": "3"},
+            {"product_id": 3, "delta": "1", "stock_size": "1"},
+        ]
+        response = self.post_stock_changes(stock_changes, self.store_administrator)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_207_MULTI_STATUS
+        # Response Content
+        assert [result['status'] for result in response.data] == \
+            ['updated', 'rejected', 'rejected', 'rejected', 'rejected']
+        assert response.data[1]['error'] == 'Not enough products in stock. Available stock: 0.00.'
+        assert response.data[2]['error'] == 'Product does not exist.'
+        assert response.data[3]['error'] == 'Duplicate product_id in request.'
+
+        # Only the valid change was written
+        assert ProductStock.objects.count() == stock_entries_before_request + 1
+        assert Product.objects.get(pk=1).current_stock == 10
+
+    def test_bad_request_data(self):
+        response = self.post_stock_changes({"product_id": 1, "delta": "10"}, self.store_administrator)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.usefixtures("db",
+                         "three_products_db",
+                         "regular_user", "member_of_staff", "store_administrator")
+class ProductStockHistoryViewTest(APITestCase):
+    view = ProductStockHistoryView
+    product_id = 1
+    url = reverse(view.name, kwargs={'product_id': str(product_id)})
+    factory = APIRequestFactory()
+
+    def setUp(self):
+        # initial entry of the product, followed by eight stock updates on consecutive days
+        ProductStock.objects.filter(product_id=self.product_id).update(
+            update_timestamp=datetime(2021, 1, 1, tzinfo=timezone.utc)
+        )
+        for day in range(2, 10):
+            entry = ProductStock.objects.create(product_id=self.product_id, stock_size=day * 10)
+            ProductStock.objects.filter(pk=entry.pk).update(
+                update_timestamp=datetime(2021, 1, day, tzinfo=timezone.utc)
+            )
+
+    def get_history(self, url, auth_user=None):
+        view = self.view.as_view()
+        request = self.factory.get(url)
+        if auth_user is not None:
+            force_authenticate(request, user=auth_user)
+        response = view(request, product_id=self.product_id)
+        response.render()
+        return response
+
+    def collect_history(self, url):
+        stock_sizes = []
+        while url:
+            response = self.get_history(url, self.store_administrator)
+            assert response.status_code == status.HTTP_200_OK
+            stock_sizes += [entry['stock_size'] for entry in response.data['results']]
+            url = response.data['next']
+        return stock_sizes
+
+    def test_anonymous_cant_view_stock_history(self):
+        response = self.get_history(self.url)
+
+        # Response Content
+        assert response.content == b'{"detail":"Authentication credentials were not provided."}'
+        # Response Status Code
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_regular_user_cant_view_stock_history(self):
+        response = self.get_history(self.url, self.regular_user)
+
+        # Response Content
+        assert response.content == b'{"detail":"You do not have permission to perform this action."}'
+        # Response Status Code
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_stock_history_is_paginated_newest_first(self):
+        response = self.get_history(self.url + '?limit=3', self.store_administrator)
+
+        # Response Content
+        assert [entry['stock_size'] for entry in response.data['results']] == ['90.00', '80.00', '70.00']
+        assert response.data['next'] is not None
+
+        # following the next links returns the whole history exactly once
+        assert self.collect_history(self.url + '?limit=3') == \
+            ['90.00', '80.00', '70.00', '60.00', '50.00', '40.00', '30.00', '20.00', '0.00']
+
+    def test_stock_history_time_range(self):
+        url = self.url + '?from=2021-01-03T00:00:00Z&to=2021-01-05T00:00:00Z&limit=2'
+        assert self.collect_history(url) == ['50.00', '40.00', '30.00']
+
+    def test_stock_history_is_unchanged_by_compaction(self):
+        history_before_compaction = self.collect_history(self.url + '?limit=4')
+
+        compact_product_stock(self.product_id, datetime(2021, 1, 8, tzinfo=timezone.utc), period='month')
+        assert ProductStockArchive.objects.filter(product_id=self.product_id).exists()
+
+        assert self.collect_history(self.url + '?limit=4') == history_before_compaction
+
+    def test_invalid_cursor(self):
+        response = self.get_history(self.url + '?cursor=invalid', self.store_administrator)
+
+        # Response Status Code
+        assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -1,14 +1,20 @@
 from django.views.generic import TemplateView
 from django.urls import path
 from rest_framework.schemas import get_schema_view
-from .views import ProductListView, ProductDetailView
+from .views import ProductListView, ProductDetailView, ProductExportView, ProductPriceHistogramView
 from .views import ProductStockView, ProductAddStockView, ProductReduceStockView
+from .views import ProductStockHistoryView, ProductBulkStockView, ProductLowStockView
 
 
 urlpatterns = [
     path('', ProductListView.as_view(), name=ProductListView.name),
+    path('export/', ProductExportView.as_view(), name=ProductExportView.name),
+    path('price-histogram/', ProductPriceHistogramView.as_view(), name=ProductPriceHistogramView.name),
+    path('low-stock/', ProductLowStockView.as_view(), name=ProductLowStockView.name),
     path('<int:pk>/', ProductDetailView.as_view(), name=ProductDetailView.name),
     path('<int:product_id>/stock/', ProductStockView.as_view(), name=ProductStockView.name),
+    path('<int:product_id>/stock/history/', ProductStockHistoryView.as_view(), name=ProductStockHistoryView.name),
     path('<int:product_id>/stock/add/', ProductAddStockView.as_view(), name=ProductAddStockView.name),
     path('<int:product_id>/stock/reduce/', ProductReduceStockView.as_view(), name=ProductReduceStockView.name),
+    path('stock/bulk/', ProductBulkStockView.as_view(), name=ProductBulkStockView.name),
 ]
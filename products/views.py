@@ -1,12 +1,32 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+from django.utils.http import urlencode
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 from rest_framework import generics
 from rest_framework import status
 from rest_framework.response import Response
-from .models import Product
+from rest_framework import serializers
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.filters import OrderingFilter
+from config.conditional import collection_validators, conditional_get, latest, make_etag
+from config.exports import StreamingExportView
+from config.pagination import encode_cursor, decode_cursor
+from .cache import catalog
+from .models import Product, LowStockProduct
+from . import stock
 from .permissions import HasGroupPermission
 from .serializers import ProductSerializer
 from .serializers import ProductStockSerializer, IncreaseProductStockSerializer, DecreaseProductStockSerializer
+from .serializers import StockChangeSerializer, LowStockProductSerializer
+from .serializers import PriceHistogramOptionsSerializer, PriceHistogramSerializer
+from .facets import price_histogram
 from .filters import ProductFilter
+from .search import ProductSearchFilter
 
 
 required_groups = {
@@ -29,6 +49,7 @@ class ProductListView(generics.ListCreateAPIView):
     required_groups = required_groups
 
     filter_class = ProductFilter
+    filter_backends = (DjangoFilterBackend, OrderingFilter, ProductSearchFilter)
 
     search_fields = (
         '$name',
@@ -41,6 +62,93 @@ class ProductListView(generics.ListCreateAPIView):
         'price'
     )
 
+    @conditional_get
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_validators(self, request, *args, **kwargs):
+        return collection_validators(self.filter_queryset(self.get_queryset()),
+                                     'update_timestamp', 'current_stock_timestamp')
+
+
+class ProductExportView(StreamingExportView):
+    """
+    Streams the products, with their current stock, as NDJSON or CSV (`?output=csv`).
+    Accepts the filters and search of the product list.
+    """
+    queryset = Product.objects.all()
+    name = 'products-export'
+
+    permission_classes = (HasGroupPermission, )
+    required_groups = required_groups
+
+    filter_backends = (DjangoFilterBackend, ProductSearchFilter)
+    filter_class = ProductFilter
+    search_fields = ProductListView.search_fields
+
+    export_filename = 'products'
+    csv_fieldnames = ('id', 'name', 'code', 'price', 'unit', 'available_stock', 'stock_update_timestamp')
+    chunk_size = 2000
+
+    def get_records(self, queryset):
+        products = queryset.order_by('pk').values_list(
+            'id', 'name', 'code', 'price', 'unit', 'current_stock', 'current_stock_timestamp'
+        )
+        for row in products.iterator(chunk_size=self.chunk_size):
+            yield dict(zip(self.csv_fieldnames, row))
+
+
+class ProductPriceHistogramView(generics.GenericAPIView):
+    """
+    Returns the count, min and max price, and the price histogram (`?mode=fixed` or `?mode=quantile`,
+    with `?buckets=` buckets) of the products matching the filters and search of the product list.
+    """
+    queryset = Product.objects.all()
+    name = 'product-price-histogram'
+
+    permission_classes = (HasGroupPermission, )
+    required_groups = required_groups
+
+    filter_backends = (DjangoFilterBackend, ProductSearchFilter)
+    filter_class = ProductFilter
+    search_fields = ProductListView.search_fields
+
+    cache_key_prefix = 'products:price-histogram:'
+
+    def get(self, request):
+        options_serializer = PriceHistogramOptionsSerializer(data=request.query_params)
+        if not options_serializer.is_valid():
+            return Response(options_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        cache_key = self.get_cache_key(request)
+        histogram = cache.get(cache_key)
+        if histogram is None:
+            histogram = price_histogram(self.filter_queryset(self.get_queryset()),
+                                        **options_serializer.validated_data)
+            histogram = PriceHistogramSerializer(histogram).data
+            cache.set(cache_key, histogram, settings.PRICE_HISTOGRAM_CACHE_TIMEOUT)
+        return Response(histogram)
+
+    def get_cache_key(self, request):
+        # the same filters given in any order, or with repeated values, share a cache entry
+        params = sorted((param, sorted(set(values))) for param, values in request.query_params.lists())
+        digest = hashlib.md5(urlencode(params, doseq=True).encode()).hexdigest()
+        return f'{self.cache_key_prefix}{digest}'
+
+
+class ProductLowStockView(generics.ListAPIView):
+    """
+    Lists the products with a current stock below their reorder threshold.
+    """
+    queryset = LowStockProduct.objects.select_related('product')
+    serializer_class = LowStockProductSerializer
+    name = 'products-low-stock'
+
+    permission_classes = (HasGroupPermission, )
+    required_groups = required_groups
+
+    filter_backends = ()
+
 
 class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Product.objects.all()
@@ -50,12 +158,39 @@ class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = (HasGroupPermission, )
     required_groups = required_groups
 
+    @conditional_get
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_validators(self, request, *args, **kwargs):
+        product = catalog.get(kwargs['pk'])
+        if product is None:
+            return None
+        etag = make_etag(product.pk, product.update_timestamp, product.current_stock, product.current_stock_timestamp)
+        return etag, latest(product.update_timestamp, product.current_stock_timestamp)
+
+    def retrieve(self, request, *args, **kwargs):
+        product = catalog.get(kwargs['pk'])
+        if product is None:
+            raise Http404
+        serializer = self.get_serializer(product)
+        return Response(serializer.data)
+
 
 class ProductStockView(APIView):
     name = 'product-stock'
     permission_classes = (HasGroupPermission, )
     required_groups = required_groups
 
+    def get_validators(self, request, product_id):
+        product = catalog.get(product_id)
+        if product is None:
+            return None
+        # the current stock columns are a copy of the latest stock entry
+        etag = make_etag(product.pk, product.current_stock, product.current_stock_timestamp)
+        return etag, product.current_stock_timestamp
+
+    @conditional_get
     def get(self, request, product_id):
         try:
             product = Product.objects.get(pk=product_id)
@@ -89,6 +224,74 @@ class ProductStockView(APIView):
                 return Response(product_stock_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class ProductStockHistoryView(APIView):
+    """
+    Lists the stock entries of a product, newest first, optionally limited to the
+    `from`/`to` time range. Pages are linked with a `cursor` keyset on (update_timestamp, id).
+    """
+    name = 'product-stock-history'
+    permission_classes = (HasGroupPermission, )
+    required_groups = required_groups
+
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+
+    def get(self, request, product_id):
+        if not Product.objects.filter(pk=product_id).exists():
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        timestamp_field = serializers.DateTimeField()
+        time_range = {}
+        errors = {}
+        for param in ('from', 'to'):
+            if param in request.query_params:
+                try:
+                    time_range[param] = timestamp_field.run_validation(request.query_params[param])
+                except ValidationError as e:
+                    errors[param] = e.detail
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        limit = self.get_limit(request)
+        before = None
+        if self.cursor_query_param in request.query_params:
+            before = self.decode_position(request.query_params[self.cursor_query_param])
+
+        entries = stock.stock_history(product_id, time_range.get('from'), time_range.get('to'),
+                                      before, limit + 1)
+        next_url = None
+        if len(entries) > limit:
+            entries = entries[:limit]
+            last_entry = entries[-1]
+            cursor = encode_cursor([last_entry.update_timestamp.isoformat(), last_entry.pk])
+            next_url = replace_query_param(request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+        return Response({
+            'next': next_url,
+            'results': ProductStockSerializer(entries, many=True).data
+        })
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return settings.DEFAULT_PAGE_SIZE
+        return min(max(limit, 1), settings.MAX_PAGE_SIZE)
+
+    @staticmethod
+    def decode_position(cursor):
+        position = decode_cursor(cursor)
+        try:
+            update_timestamp, entry_id = position
+            update_timestamp = parse_datetime(update_timestamp)
+            entry_id = int(entry_id)
+        except (TypeError, ValueError):
+            raise NotFound('Invalid cursor')
+        if update_timestamp is None:
+            raise NotFound('Invalid cursor')
+        return update_timestamp, entry_id
+
+
 class ProductAddStockView(APIView):
     name = 'product-stock-add'
     permission_classes = (HasGroupPermission, )
@@ -138,3 +341,45 @@ class ProductReduceStockView(APIView):
             else:
                 return Response(product_stock_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+
+class ProductBulkStockView(APIView):
+    """
+    Applies a list of stock changes, each one either a `delta` or an absolute `stock_size`
+    for a `product_id`, in a single transaction, and reports the result of every change.
+    """
+    name = 'product-stock-bulk'
+    permission_classes = (HasGroupPermission, )
+    required_groups = required_groups
+
+    def post(self, request):
+        if not isinstance(request.data, list):
+            return Response("Bad request data", status=status.HTTP_400_BAD_REQUEST)
+        if len(request.data) > settings.MAX_BULK_STOCK_CHANGES:
+            return Response(f"At most {settings.MAX_BULK_STOCK_CHANGES} stock changes can be sent at once",
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        change_serializer = StockChangeSerializer()
+        results = [None] * len(request.data)
+        changes = []
+        change_indexes = []
+        for index, item in enumerate(request.data):
+            try:
+                changes.append(change_serializer.run_validation(item))
+                change_indexes.append(index)
+            except ValidationError as e:
+                results[index] = {
+                    'product_id': item.get('product_id') if isinstance(item, dict) else None,
+                    'status': 'rejected',
+                    'error': e.detail,
+                }
+
+        for index, result in zip(change_indexes, stock.bulk_change_stock(changes)):
+            if result['status'] == 'updated':
+                result['stock_size'] = str(result['stock_size'])
+            results[index] = result
+
+        if any(result['status'] == 'rejected' for result in results):
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+        return Response(results, status=response_status)